@@ -1,15 +1,154 @@
 import boto3
 import os
 import base64
+import hashlib
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv
+import pyarrow.parquet as pq
 import time
+import math
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from botocore.exceptions import ClientError
 import logging
 
+# DynamoDB items are limited to 400KB including attribute names and values,
+# so each chunk leaves 1KB for the keys and attribute names by default.
+ITEM_SIZE_LIMIT = 400 * 1024
+CHUNK_SIZE = ITEM_SIZE_LIMIT - 1024
+
+# Each date holds up to SLOT_SIZE items per file. Slot 0 (ChunkIDs 0 to 999999) holds the unnamed file
+# of the date, and every named file gets the next free slot, with its manifest at slot * SLOT_SIZE.
+SLOT_SIZE = 10 ** 6
+
+# Each date has a registry item, below slot 0, mapping the names of its files to their slots,
+# so that a name is claimed atomically with a conditional update.
+REGISTRY_CHUNK_ID = -1
+
+# Version of the storage format written in the manifest item. Files without a manifest are
+# stored in the original format, as base64 text chunks.
+FORMAT_VERSION = 2
+
+
+class _AdaptiveRateLimiter:
+    """
+    Token bucket pacing writes in capacity units per second. Writes are not paced until DynamoDB
+    throttles them, so uploads use the burst and on-demand capacity of the table. The first throttle
+    sets the rate to half the throughput reached so far, and each later one halves it, never below
+    the sustained rate of the table. The rate is raised slowly after each successful write, and the
+    bucket holds up to 'burst' seconds of it.
+    """
+
+    def __init__(self, min_rate, burst=5.0):
+        self.min_rate = min_rate
+        self.burst = burst
+        self.rate = None
+        self.tokens = 0.0
+        self.started = self.updated = time.monotonic()
+        self.units = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self, units):
+        with self.lock:
+            now = time.monotonic()
+            self.units += units
+            if self.rate is None:
+                return
+            # Refill the bucket for the elapsed time and take the units, waiting out any shortfall
+            self.tokens = min(self.rate * self.burst, self.tokens + (now - self.updated) * self.rate) - units
+            self.updated = now
+            wait = max(0.0, -self.tokens / self.rate)
+        time.sleep(wait)
+
+    def throttled(self):
+        with self.lock:
+            now = time.monotonic()
+            if self.rate is None:
+                self.rate = self.units / max(now - self.started, 1.0)
+                self.tokens, self.updated = 0.0, now
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def succeeded(self):
+        with self.lock:
+            if self.rate is not None:
+                self.rate *= 1.1
+
+
+class _ChunkSink:
+    """
+    File-like object that cuts the bytes written to it into chunk items and uploads them in
+    batches of 25 as they fill, keeping at most one batch per worker in flight.
+    """
+
+    def __init__(self, date_id, base, write_batch, executor, workers, chunk_size=CHUNK_SIZE):
+        self.date_id = date_id
+        self.base = base
+        self.chunk_size = chunk_size
+        self.write_batch = write_batch
+        self.executor = executor
+        self.workers = workers
+        self.buffer = bytearray()
+        self.items = []
+        self.futures = []
+        self.consumed = 0.0
+        self.chunk_count = 0
+        self.size = 0
+        self.checksum = hashlib.sha256()
+        self.closed = False
+
+    def write(self, data):
+        self.buffer += data
+        self.size += len(data)
+        self.checksum.update(data)
+        while len(self.buffer) >= self.chunk_size:
+            self._add_chunk(bytes(self.buffer[:self.chunk_size]))
+            del self.buffer[:self.chunk_size]
+        return len(data)
+
+    def tell(self):
+        return self.size
+
+    def flush(self):
+        pass
+
+    def _add_chunk(self, chunk):
+        # ChunkIDs start from 1 after the base, which is left for the manifest
+        self.chunk_count += 1
+        self.items.append({
+            'Binary': {'B': chunk},
+            'ChunkID': {'N': str(self.base + self.chunk_count)},
+            'DateID': {'N': str(self.date_id)}
+        })
+        if len(self.items) == 25:
+            self._submit()
+
+    def _submit(self):
+        # Wait for the oldest batch before exceeding one batch in flight per worker
+        if len(self.futures) >= self.workers:
+            self.consumed += self.futures.pop(0).result()
+        self.futures.append(self.executor.submit(self.write_batch, self.items))
+        self.items = []
+
+    def close(self):
+        if self.closed:
+            return
+        if self.buffer:
+            self._add_chunk(bytes(self.buffer))
+            self.buffer = bytearray()
+        if self.items:
+            self._submit()
+        for future in self.futures:
+            self.consumed += future.result()
+        self.futures = []
+        self.closed = True
+
+
 class DynamoDBFileManager:
 
     """
-    A class for uploading and downloading CSV files to/from Amazon DynamoDB.
+    A class for uploading and downloading CSV files to/from Amazon DynamoDB, with any number of named files per date.
 
     Args:
         aws_access_key_id (str): The AWS access key ID for authentication.
@@ -17,6 +156,8 @@ class DynamoDBFileManager:
         region_name (str): The AWS region where DynamoDB is located.
         table_name (str): The name of the selected DynamoDB table.
         selected_date (int): The selected date in YYYYMMDD format as an integer.
+        chunk_size (int, optional): The size in bytes of each chunk item. Defaults to CHUNK_SIZE, just under the 400KB item limit;
+            smaller chunks suit emulators such as moto, which count item sizes differently.
 
     Attributes:
         session (boto3.Session): The Boto3 session for AWS authentication and resource management.
@@ -24,24 +165,42 @@ class DynamoDBFileManager:
 
     Methods:
         - does_table_exist(): Checks if the specified DynamoDB table exists.
-        - create_table(): Creates a DynamoDB table for data storage.
-        - upload_file(file_path): Uploads a file to DynamoDB in Parquet format with ZIP compression.
-        - download_file(output_dir): Downloads a Parquet file from DynamoDB and saves it to the output directory.     
+        - create_table(): Creates a DynamoDB table for data storage, with the catalog index.
+        - does_catalog_index_exist() / create_catalog_index(): Checks for and adds the catalog index on tables created without it.
+        - does_date_exist(): Checks if the unnamed file is already stored for the selected date.
+        - upload_file(file_path, file_name, workers, delimiter, compression): Uploads a CSV file converted to Parquet, or a Parquet file as is, writing chunks in parallel batches.
+        - get_manifest(file_name): Returns the manifest item of a file of the selected date, if the file has one.
+        - list_files(start_date, end_date): Lists the catalog of files stored within a date range.
+        - download_file(output_dir, workers, file_name): Downloads a Parquet file from DynamoDB and saves it to the output directory.     
+        - download_range(start_date, end_date, output_dir, workers): Downloads every file stored within a date range concurrently.
 
     Data Transformation:
-    - Data Conversion: When uploading a file, it reads data from a text/csv file, converts it to Parquet format, and applies ZIP compression to the data for storage efficiency.
-    - Chunking: If the data size exceeds 400KB, it automatically splits the data into smaller chunks and uploads them individually.
-    - Download and Transformation: When downloading a file, the class retrieves data from DynamoDB and reconstructs it into Parquet format.
+    - Data Conversion: When uploading a file, it reads data from a text/csv file block by block and converts it to Parquet format with GZIP (or ZSTD) compression,
+      uploading chunks as the Parquet output grows. Single-character delimiters use the pyarrow CSV reader, others fall back to chunked pandas reads.
+      Files that are already Parquet are uploaded as they are.
+    - Chunking: The data is stored as native binary, split into chunks sized against the 400KB item limit and uploaded in batches of up to 25 items.
+    - Manifest: A manifest item is reserved as pending before the chunks are written. Once all chunks are stored, it records the format version,
+      chunk count, total size, SHA-256 checksum and codec. Files uploaded before the manifest existed are stored as base64 text chunks and are still readable.
+      Failed uploads delete what they wrote, and pending manifests older than the pending timeout are taken over by the next upload of the file.
+    - Catalog: Each date holds the unnamed file in slot 0 (ChunkIDs 0 to 999999) and named files in the following slots, with ChunkID = slot * 1000000 + chunk.
+      A registry item (ChunkID -1) maps file names to their slots, and is updated conditionally so that each name is stored once per date.
+      Manifests carry a CatalogMonth attribute, so the sparse 'CatalogIndex' (CatalogMonth, DateID) lists them by date range without reading any chunks.
+    - Throughput: Batches are written by a thread pool as fast as the table accepts them. Once DynamoDB throttles, a token bucket paces them at a rate cut on each throttle,
+      never below the provisioned write capacity, and unprocessed items are retried with exponential backoff and jitter.
+    - Download and Transformation: When downloading a file, the class fetches its chunks in order from DynamoDB, with parallel BatchGetItem requests when a manifest exists,
+      and streams them to disk as a Parquet file.
 
     Example Usage:
     ```python
     file_manager = DynamoDBFileManager(aws_access_key_id, aws_secret_access_key, region_name, 'your_table_name', selected_date)
     file_manager.upload_file('input.txt')
     file_manager.download_file('output_directory')
+    file_manager.upload_file('input.txt', file_name='input')
+    file_manager.download_range(20231101, 20231130, 'output_directory')
     """
 
 
-    def __init__(self, aws_access_key_id, aws_secret_access_key, region_name, table_name, selected_date):
+    def __init__(self, aws_access_key_id, aws_secret_access_key, region_name, table_name, selected_date, chunk_size=CHUNK_SIZE):
         # Initialize the Boto3 session with the provided credentials and region
         self.session = boto3.Session(
             aws_access_key_id=aws_access_key_id,
@@ -58,9 +217,24 @@ class DynamoDBFileManager:
         # Declare the target table
         self.table_name=table_name
 
-        # Check if table exists
+        # Size of the chunk items, which must fit in a DynamoDB item with their keys
+        if not 0 < chunk_size <= CHUNK_SIZE:
+            raise ValueError(f"chunk_size must be between 1 and {CHUNK_SIZE} bytes.")
+        self.chunk_size = chunk_size
+
+        # Retry settings for throttled writes
+        self.max_retries = 8
+        self.base_delay = 0.05
+        self.max_delay = 5.0
+
+        # Seconds after which a pending upload is considered abandoned, and its slot can be taken over
+        self.pending_timeout = 3600
+
+        # Check if table exists, and add the catalog index to tables created before it
         if not self.does_table_exist():
             self.create_table()
+        elif not self.does_catalog_index_exist():
+            self.create_catalog_index()
 
 
     def does_table_exist(self):
@@ -105,8 +279,10 @@ class DynamoDBFileManager:
                 ],
                 AttributeDefinitions=[
                     {"AttributeName": "DateID", "AttributeType": "N"},
-                    {"AttributeName": "ChunkID", "AttributeType": "N"}
+                    {"AttributeName": "ChunkID", "AttributeType": "N"},
+                    {"AttributeName": "CatalogMonth", "AttributeType": "N"}
                 ],
+                GlobalSecondaryIndexes=[self._catalog_index()],
                 ProvisionedThroughput={
                     "ReadCapacityUnits": 10,
                     "WriteCapacityUnits": 10,
@@ -123,107 +299,758 @@ class DynamoDBFileManager:
             print(f'Created table: {self.table_name}')
 
 
-    def upload_file(self, file_path):
+    @staticmethod
+    def _catalog_index():
+        """
+        Returns the definition of the catalog index, a sparse GSI over the manifest items.
+        """
+        return {
+            "IndexName": "CatalogIndex",
+            "KeySchema": [
+                {"AttributeName": "CatalogMonth", "KeyType": "HASH"},
+                {"AttributeName": "DateID", "KeyType": "RANGE"},
+            ],
+            "Projection": {"ProjectionType": "ALL"},
+            "ProvisionedThroughput": {
+                "ReadCapacityUnits": 10,
+                "WriteCapacityUnits": 10,
+            }
+        }
+
+
+    def does_catalog_index_exist(self):
+        """
+        Checks if the table has the catalog index.
 
+        :return: True if the index exists, False otherwise.
         """
-        Uploads a file to DynamoDB.
+        response = self.dynamodb.describe_table(TableName=self.table_name)
+        return any(index['IndexName'] == 'CatalogIndex' for index in response['Table'].get('GlobalSecondaryIndexes', []))
+
+
+    def create_catalog_index(self):
+        """
+        Adds the catalog index to an existing table and waits until it is active.
+        """
+        index = self._catalog_index()
+        # On-demand tables take no provisioned throughput for their indexes
+        response = self.dynamodb.describe_table(TableName=self.table_name)
+        if response['Table'].get('BillingModeSummary', {}).get('BillingMode') == 'PAY_PER_REQUEST':
+            del index['ProvisionedThroughput']
+
+        self.dynamodb.update_table(
+            TableName=self.table_name,
+            AttributeDefinitions=[
+                {"AttributeName": "DateID", "AttributeType": "N"},
+                {"AttributeName": "CatalogMonth", "AttributeType": "N"}
+            ],
+            GlobalSecondaryIndexUpdates=[{'Create': index}]
+        )
+
+        while True:
+            indexes = self.dynamodb.describe_table(TableName=self.table_name)['Table'].get('GlobalSecondaryIndexes', [])
+            if any(index['IndexName'] == 'CatalogIndex' and index.get('IndexStatus', 'ACTIVE') == 'ACTIVE' for index in indexes):
+                break
+            time.sleep(5)
+        print(f'Created catalog index on table: {self.table_name}')
+
+
+    def does_date_exist(self):
+        """
+        Checks if the unnamed file is already stored for the selected date.
+
+        :return: True if any chunk of slot 0 exists for the date, False otherwise.
+        """
+        response = self.dynamodb.query(
+            TableName=self.table_name,
+            KeyConditionExpression='DateID = :date AND ChunkID BETWEEN :first AND :last',
+            ExpressionAttributeValues={':date': {'N': str(self.selected_date)}, ':first': {'N': '0'}, ':last': {'N': str(SLOT_SIZE - 1)}},
+            Select='COUNT',
+            Limit=1
+        )
+        return response['Count'] > 0
+
+
+    def _write_capacity(self):
+        """
+        Returns the provisioned write capacity of the table, or a high sustained rate for on-demand tables.
+        """
+        response = self.dynamodb.describe_table(TableName=self.table_name)
+        units = response['Table'].get('ProvisionedThroughput', {}).get('WriteCapacityUnits', 0)
+        return float(units) if units else 1000.0
+
+
+    @staticmethod
+    def _item_size(item):
+        """
+        Returns the size of an item as DynamoDB counts it, from its attribute names and values.
+        """
+        return sum(len(name) + len(next(iter(value.values()))) for name, value in item.items())
+
+
+    def _backoff(self, attempt):
+        """
+        Sleeps for an exponentially growing, fully jittered delay.
+        """
+        time.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+
+
+    def _batch_write(self, items, limiter, delete=False):
+        """
+        Writes up to 25 items with BatchWriteItem, retrying unprocessed and throttled items.
 
         Args:
-            file_path (str): The path to the text file you want to upload.
+            items (list): The items to be written, or their keys when deleting.
+            limiter (_AdaptiveRateLimiter): The rate limiter shared by the upload.
+            delete (bool): Whether to delete the items instead.
 
+        Returns:
+            float: The consumed write capacity units.
         """
-        # Read data from the CSV file and convert it to Parquet format
-        df = pd.read_csv(file_path, delimiter=': ',engine='python')  #Change to custom delimeter
-        parquet_df = df.to_parquet(compression='gzip')
+        requests = [{'DeleteRequest': {'Key': item}} if delete else {'PutRequest': {'Item': item}} for item in items]
+        consumed = 0.0
+
+        for attempt in range(self.max_retries + 1):
+            # Items of 1KB or less cost one write capacity unit each
+            limiter.acquire(sum(
+                math.ceil(self._item_size(request['PutRequest']['Item'] if 'PutRequest' in request else request['DeleteRequest']['Key']) / 1024)
+                for request in requests
+            ))
+            try:
+                response = self.dynamodb.batch_write_item(
+                    RequestItems={self.table_name: requests},
+                    ReturnConsumedCapacity='TOTAL'
+                )
+            except ClientError as e:
+                if e.response['Error']['Code'] not in ('ProvisionedThroughputExceededException', 'ThrottlingException'):
+                    raise
+                limiter.throttled()
+                self._backoff(attempt)
+                continue
+
+            consumed += sum(capacity.get('CapacityUnits', 0) for capacity in response.get('ConsumedCapacity', []))
+            requests = response.get('UnprocessedItems', {}).get(self.table_name, [])
+            if not requests:
+                limiter.succeeded()
+                return consumed
+
+            # Unprocessed items mean the table is over its throughput
+            limiter.throttled()
+            self._backoff(attempt)
 
-        # Encode the Parquet content as base64
-        encoded_content = base64.b64encode(parquet_df).decode('utf-8')
+        raise RuntimeError(f"Could not write {len(requests)} items to {self.table_name} after {self.max_retries} retries.")
 
-        # Check if the file size exceeds 400KB
-        if len(encoded_content) > 400 * 1000:
-            is_chunked = True
-            chunk_size = 400 * 1000
-            chunks = [encoded_content[i:i+chunk_size] for i in range(0, len(encoded_content), chunk_size)]
+
+    def _write_parquet(self, file_path, sink, delimiter, compression, block_size):
+        """
+        Converts a CSV file to Parquet block by block, writing a row group per block into the sink.
+
+        Args:
+            file_path (str): The path to the text file.
+            sink (_ChunkSink): The sink receiving the Parquet output.
+            delimiter (str): The delimiter of the text file.
+            compression (str): The Parquet compression codec.
+            block_size (int): The number of bytes read per block.
+        """
+        if len(delimiter) == 1:
+            # The pyarrow CSV reader only supports single-character delimiters
+            reader = pyarrow.csv.open_csv(
+                file_path,
+                read_options=pyarrow.csv.ReadOptions(block_size=block_size),
+                parse_options=pyarrow.csv.ParseOptions(delimiter=delimiter)
+            )
+            with pq.ParquetWriter(sink, reader.schema, compression=compression) as writer:
+                for batch in reader:
+                    writer.write_batch(batch)
         else:
-            is_chunked = False
-            chunks = [encoded_content]
-
-        # Upload each chunk to DynamoDB with the updated ChunkID value
-        for index, chunk in enumerate(chunks, start=1):
-            # Create a dictionary containing the data to be uploaded to DynamoDB
-            item = {
-                'Binary': {'B': chunk},
-                'ChunkID': {'N': str(index)} if is_chunked else {'N': str(0)},  # Set to None if not chunked
-                'DateID': {'N': str(self.selected_date)}
+            # Other delimiters need the python engine, read in chunks of rows with the schema of the first one
+            writer = None
+            for chunk in pd.read_csv(file_path, delimiter=delimiter, engine='python', chunksize=100000):
+                table = pa.Table.from_pandas(chunk, schema=writer.schema if writer else None, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(sink, table.schema, compression=compression)
+                writer.write_table(table)
+            if writer:
+                writer.close()
+
+
+    def _manifest_item(self, slot, file_name, status, sink=None, codec=None):
+        """
+        Builds the manifest item of a file, with its content details once it is complete.
+        """
+        item = {
+            'DateID': {'N': str(self.selected_date)},
+            'ChunkID': {'N': str(slot * SLOT_SIZE)},
+            'FormatVersion': {'N': str(FORMAT_VERSION)},
+            'Status': {'S': status},
+            'CatalogMonth': {'N': str(self.selected_date // 100)}
+        }
+        if file_name:
+            item['FileName'] = {'S': file_name}
+        if status == 'pending':
+            item['ReservedAt'] = {'N': str(int(time.time()))}
+        if sink:
+            item['ChunkCount'] = {'N': str(sink.chunk_count)}
+            item['TotalSize'] = {'N': str(sink.size)}
+            item['Checksum'] = {'S': sink.checksum.hexdigest()}
+            item['Codec'] = {'S': codec}
+        return item
+
+
+    def _is_stale(self, item):
+        """
+        Checks whether a manifest item is a pending reservation older than the pending timeout,
+        left by an upload that did not complete. Reservations without a time are stale too.
+        """
+        if item.get('Status', {}).get('S') != 'pending':
+            return False
+        reserved_at = item.get('ReservedAt', {}).get('N')
+        return reserved_at is None or time.time() - int(reserved_at) > self.pending_timeout
+
+
+    def _get_item(self, chunk_id):
+        """
+        Returns an item of the selected date with a strongly consistent read, or None if it does not exist.
+        """
+        response = self.dynamodb.get_item(
+            TableName=self.table_name,
+            Key={'DateID': {'N': str(self.selected_date)}, 'ChunkID': {'N': str(chunk_id)}},
+            ConsistentRead=True
+        )
+        return response.get('Item')
+
+
+    def _delete_chunks(self, slot):
+        """
+        Deletes the chunks stored in a slot of the selected date, leaving its manifest.
+        """
+        query_params = {
+            'TableName': self.table_name,
+            'KeyConditionExpression': 'DateID = :date AND ChunkID BETWEEN :first AND :last',
+            'ExpressionAttributeValues': {
+                ':date': {'N': str(self.selected_date)},
+                ':first': {'N': str(slot * SLOT_SIZE + 1)},
+                ':last': {'N': str((slot + 1) * SLOT_SIZE - 1)}
+            },
+            'ProjectionExpression': 'DateID, ChunkID',
+            'ConsistentRead': True
+        }
+        limiter = _AdaptiveRateLimiter(self._write_capacity())
+
+        while True:
+            response = self.dynamodb.query(**query_params)
+            keys = response.get('Items', [])
+            for i in range(0, len(keys), 25):
+                self._batch_write(keys[i:i+25], limiter, delete=True)
+
+            if 'LastEvaluatedKey' not in response:
+                break
+            query_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+    def _put_pending(self, slot, file_name, takeover=False):
+        """
+        Writes the pending manifest of a slot if the slot is free, or with takeover, if it holds a stale reservation,
+        in which case the chunks left in it are deleted.
+
+        Returns:
+            bool: Whether the slot was reserved.
+        """
+        condition = {'ConditionExpression': "attribute_not_exists(ChunkID)"}
+        if takeover:
+            condition = {
+                'ConditionExpression': "attribute_not_exists(ChunkID) OR (#status = :pending AND (attribute_not_exists(ReservedAt) OR ReservedAt < :stale))",
+                'ExpressionAttributeNames': {'#status': 'Status'},
+                'ExpressionAttributeValues': {':pending': {'S': 'pending'}, ':stale': {'N': str(int(time.time() - self.pending_timeout))}}
             }
+        try:
+            response = self.dynamodb.put_item(
+                TableName=self.table_name,
+                Item=self._manifest_item(slot, file_name, 'pending'),
+                ReturnValues='ALL_OLD',
+                **condition
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            return False
 
-            # Put the item in the DynamoDB table
-            self.dynamodb.put_item(TableName= self.table_name, Item=item, ConditionExpression="attribute_not_exists(DateID)")
-            print(f'Uploaded DateID: {item["DateID"]["N"]} ChunkID: {item["ChunkID"]["N"]}')
-             # Sleep for a short duration before the next check
-            time.sleep(5)
+        if 'Attributes' in response:
+            self._delete_chunks(slot)
+        return True
 
 
-    def download_file(self, output_dir):
+    def _claim_name(self, file_name, slot):
+        """
+        Registers the slot of a named file in the registry item of the selected date, unless the name is taken.
+        The conditional update settles concurrent uploads of the same name, which the catalog index,
+        being eventually consistent, cannot. A name whose upload did not complete is taken over.
+
+        Raises:
+            FileExistsError: If the file is already stored for the selected date, or being uploaded.
+        """
+        key = {'DateID': {'N': str(self.selected_date)}, 'ChunkID': {'N': str(REGISTRY_CHUNK_ID)}}
+        names = {'#name': file_name}
+
+        # The map of names has to exist before a name can be set in it
+        self.dynamodb.update_item(
+            TableName=self.table_name,
+            Key=key,
+            UpdateExpression='SET Files = if_not_exists(Files, :empty)',
+            ExpressionAttributeValues={':empty': {'M': {}}}
+        )
+        previous = None
+        while previous is None:
+            try:
+                self.dynamodb.update_item(
+                    TableName=self.table_name,
+                    Key=key,
+                    UpdateExpression='SET Files.#name = :slot',
+                    ConditionExpression='attribute_not_exists(Files.#name)',
+                    ExpressionAttributeNames=names,
+                    ExpressionAttributeValues={':slot': {'N': str(slot)}}
+                )
+                return
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+            # The name may have been freed in the meantime, in which case it is claimed again
+            previous = self._get_item(REGISTRY_CHUNK_ID)['Files']['M'].get(file_name, {}).get('N')
+
+        # The name only stands if its slot still holds the file, or an upload in progress
+        item = self._get_item(int(previous) * SLOT_SIZE)
+        owned = item is not None and item.get('FileName', {}).get('S') == file_name
+        if owned and not self._is_stale(item):
+            state = 'is being uploaded to' if item.get('Status', {}).get('S') == 'pending' else 'already exists in'
+            raise FileExistsError(f"File {file_name} of DateID {self.selected_date} {state} {self.table_name}.")
+
+        try:
+            self.dynamodb.update_item(
+                TableName=self.table_name,
+                Key=key,
+                UpdateExpression='SET Files.#name = :slot',
+                ConditionExpression='Files.#name = :previous',
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues={':slot': {'N': str(slot)}, ':previous': {'N': previous}}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            raise FileExistsError(f"File {file_name} of DateID {self.selected_date} is being uploaded to {self.table_name}.")
+
+        # Remove what the upload that did not complete left behind
+        if owned:
+            self._delete_chunks(int(previous))
+            self.dynamodb.delete_item(
+                TableName=self.table_name,
+                Key={'DateID': {'N': str(self.selected_date)}, 'ChunkID': item['ChunkID']},
+                ConditionExpression='ReservedAt = :reserved OR attribute_not_exists(ReservedAt)',
+                ExpressionAttributeValues={':reserved': item.get('ReservedAt', {'N': '0'})}
+            )
+
+
+    def _reserve_slot(self, file_name):
+        """
+        Reserves the slot of a file of the selected date with a pending manifest.
+
+        Args:
+            file_name (str): The name of the file, or None for the unnamed file in slot 0.
+
+        Returns:
+            int: The reserved slot.
+
+        Raises:
+            FileExistsError: If the file is already stored for the selected date, or being uploaded.
+        """
+        if file_name is None:
+            # BatchWriteItem cannot be conditional, so check that the date is free of files in the original format beforehand
+            item = self._get_item(0)
+            if (item is None and self.does_date_exist()) or not self._put_pending(0, None, takeover=True):
+                raise FileExistsError(f"DateID {self.selected_date} already exists in {self.table_name}.")
+            return 0
+
+        # Files named before the registry are only in the catalog
+        files = self.list_files(self.selected_date, self.selected_date)
+        if any(entry['file_name'] == file_name and entry['status'] == 'complete' for entry in files):
+            raise FileExistsError(f"File {file_name} of DateID {self.selected_date} already exists in {self.table_name}.")
+
+        # The conditional put settles concurrent uploads, moving named files on to the next slot
+        slot = max([entry['slot'] for entry in files], default=0) + 1
+        while not self._put_pending(slot, file_name):
+            slot += 1
+
+        try:
+            self._claim_name(file_name, slot)
+        except BaseException:
+            self.dynamodb.delete_item(
+                TableName=self.table_name,
+                Key={'DateID': {'N': str(self.selected_date)}, 'ChunkID': {'N': str(slot * SLOT_SIZE)}}
+            )
+            raise
+        return slot
+
+
+    def _release_slot(self, slot, file_name):
+        """
+        Deletes the chunks and the pending manifest of an upload that failed, and frees its name,
+        so that the file can be uploaded again.
+        """
+        self._delete_chunks(slot)
+        self.dynamodb.delete_item(
+            TableName=self.table_name,
+            Key={'DateID': {'N': str(self.selected_date)}, 'ChunkID': {'N': str(slot * SLOT_SIZE)}}
+        )
+        if file_name is not None:
+            try:
+                self.dynamodb.update_item(
+                    TableName=self.table_name,
+                    Key={'DateID': {'N': str(self.selected_date)}, 'ChunkID': {'N': str(REGISTRY_CHUNK_ID)}},
+                    UpdateExpression='REMOVE Files.#name',
+                    ConditionExpression='Files.#name = :slot',
+                    ExpressionAttributeNames={'#name': file_name},
+                    ExpressionAttributeValues={':slot': {'N': str(slot)}}
+                )
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+
+
+    def upload_file(self, file_path, file_name=None, workers=4, delimiter=': ', compression='gzip', block_size=16 * 1024 * 1024):
+
+        """
+        Uploads a file to DynamoDB.
+
+        Args:
+            file_path (str): The path to the text file (or Parquet file) you want to upload.
+            file_name (str): The name of the file within the selected date, or None for the unnamed file of the date.
+            workers (int): The number of batches written in parallel.
+            delimiter (str): The delimiter of the text file.
+            compression (str): The Parquet compression codec, e.g. 'gzip' or 'zstd'.
+            block_size (int): The number of bytes of the text file converted at a time.
+
+        Returns:
+            dict: The number of items, duration, items per second and consumed write capacity units.
+
+        Raises:
+            FileExistsError: If the file is already stored for the selected date, or being uploaded.
+        """
+        slot = self._reserve_slot(file_name)
+
+        try:
+            with open(file_path, 'rb') as file:
+                is_parquet = file.read(4) == b'PAR1'
+
+            # Write the chunks in batches of 25, the BatchWriteItem limit, from a thread pool as the Parquet output fills them
+            limiter = _AdaptiveRateLimiter(self._write_capacity())
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                sink = _ChunkSink(self.selected_date, slot * SLOT_SIZE, lambda batch: self._batch_write(batch, limiter), executor, workers, self.chunk_size)
+                if is_parquet:
+                    # Upload Parquet files as they are, recording the codec of their first column
+                    metadata = pq.ParquetFile(file_path).metadata
+                    codec = metadata.row_group(0).column(0).compression.lower() if metadata.num_row_groups else 'none'
+                    with open(file_path, 'rb') as file:
+                        while chunk := file.read(self.chunk_size):
+                            sink.write(chunk)
+                else:
+                    codec = compression
+                    self._write_parquet(file_path, sink, delimiter, compression, block_size)
+                sink.close()
+
+            # Complete the manifest last, so that a file is only downloadable once all of its chunks are stored
+            self.dynamodb.put_item(TableName=self.table_name, Item=self._manifest_item(slot, file_name, 'complete', sink, codec))
+        except BaseException:
+            # The executor has finished its batches by now, so everything written is removed
+            try:
+                self._release_slot(slot, file_name)
+            except Exception as e:
+                logging.error(f"Could not remove the failed upload of DateID {self.selected_date} slot {slot}: {e}")
+            raise
+        seconds = time.perf_counter() - start
+
+        stats = {
+            'items': sink.chunk_count + 1,
+            'seconds': seconds,
+            'items_per_s': (sink.chunk_count + 1) / seconds if seconds else 0.0,
+            'consumed_wcu': sink.consumed
+        }
+        print(f'Uploaded DateID: {self.selected_date}{f" file {file_name}" if file_name else ""} in {stats["items"]} items at {stats["items_per_s"]:.1f} items/s, consuming {sink.consumed:.0f} WCU')
+
+        return stats
+
+
+    @staticmethod
+    def _parse_manifest(item):
+        """
+        Converts a manifest item to a dict. Manifests written before the catalog have no status and are complete.
+        """
+        manifest = {
+            'date_id': int(item['DateID']['N']),
+            'slot': int(item['ChunkID']['N']) // SLOT_SIZE,
+            'file_name': item.get('FileName', {}).get('S'),
+            'status': item.get('Status', {}).get('S', 'complete'),
+            'format_version': int(item['FormatVersion']['N'])
+        }
+        if 'ChunkCount' in item:
+            manifest['chunk_count'] = int(item['ChunkCount']['N'])
+            manifest['total_size'] = int(item['TotalSize']['N'])
+            manifest['checksum'] = item['Checksum']['S']
+            manifest['codec'] = item['Codec']['S']
+        return manifest
+
+
+    def get_manifest(self, file_name=None):
+        """
+        Returns the manifest item of a file of the selected date.
+
+        Args:
+            file_name (str): The name of the file, or None for the unnamed file of the date.
+
+        :return: The manifest as a dict, or None if no file or a file in the original format is stored.
+        """
+        if file_name is not None:
+            return next((entry for entry in self.list_files(self.selected_date, self.selected_date) if entry['file_name'] == file_name), None)
+
+        response = self.dynamodb.get_item(
+            TableName=self.table_name,
+            Key={'DateID': {'N': str(self.selected_date)}, 'ChunkID': {'N': '0'}}
+        )
+        item = response.get('Item')
+        if not item or 'FormatVersion' not in item:
+            return None
+
+        return self._parse_manifest(item)
+
+
+    @staticmethod
+    def _months(start_date, end_date):
+        """
+        Yields the months between two dates in YYYYMM format.
+        """
+        month, last = start_date // 100, end_date // 100
+        while month <= last:
+            yield month
+            month = month + 1 if month % 100 < 12 else (month // 100 + 1) * 100 + 1
+
+
+    def list_files(self, start_date, end_date):
+        """
+        Lists the catalog of files stored within a date range, from the manifests in the catalog index.
+        Files in the original format, and unnamed files uploaded before the catalog, have no catalog entry.
+
+        Args:
+            start_date (int): The first date in YYYYMMDD format.
+            end_date (int): The last date in YYYYMMDD format.
+
+        Returns:
+            list: The manifests as dicts, sorted by date and slot.
+        """
+        files = []
+        for month in self._months(start_date, end_date):
+            query_params = {
+                'TableName': self.table_name,
+                'IndexName': 'CatalogIndex',
+                'KeyConditionExpression': 'CatalogMonth = :month AND DateID BETWEEN :start AND :end',
+                'ExpressionAttributeValues': {
+                    ':month': {'N': str(month)},
+                    ':start': {'N': str(start_date)},
+                    ':end': {'N': str(end_date)}
+                }
+            }
+            while True:
+                response = self.dynamodb.query(**query_params)
+                files.extend(self._parse_manifest(item) for item in response.get('Items', []))
+
+                if 'LastEvaluatedKey' not in response:
+                    break
+                query_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+        return sorted(files, key=lambda entry: (entry['date_id'], entry['slot']))
+
+
+    def _batch_get(self, date_id, chunk_ids):
+        """
+        Reads chunks with strongly consistent BatchGetItem requests, retrying unprocessed keys,
+        so that a download right after an upload sees every chunk its manifest counts.
+
+        Args:
+            date_id (int): The date of the chunks.
+            chunk_ids (list): The ChunkIDs to be read.
+
+        Returns:
+            dict: The content of each chunk by ChunkID.
+        """
+        keys = [{'DateID': {'N': str(date_id)}, 'ChunkID': {'N': str(chunk_id)}} for chunk_id in chunk_ids]
+        chunks = {}
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.dynamodb.batch_get_item(RequestItems={self.table_name: {'Keys': keys, 'ConsistentRead': True}})
+            except ClientError as e:
+                if e.response['Error']['Code'] not in ('ProvisionedThroughputExceededException', 'ThrottlingException'):
+                    raise
+                self._backoff(attempt)
+                continue
+
+            for item in response['Responses'].get(self.table_name, []):
+                chunks[int(item['ChunkID']['N'])] = item['Binary']['B']
+            keys = response.get('UnprocessedKeys', {}).get(self.table_name, {}).get('Keys', [])
+            if not keys:
+                return chunks
+            self._backoff(attempt)
+
+        raise RuntimeError(f"Could not read {len(keys)} chunks from {self.table_name} after {self.max_retries} retries.")
+
+
+    def _read_chunks(self, manifest, workers):
+        """
+        Yields the chunks of a file with a manifest in order, reading a window of parallel BatchGetItem requests at a time.
+
+        Raises:
+            ValueError: If chunks counted by the manifest are missing from the table.
+        """
+        # Ten chunks of up to 400KB per request, well under the 16MB BatchGetItem response limit
+        first = manifest['slot'] * SLOT_SIZE + 1
+        last = first + manifest['chunk_count']
+        requests = [list(range(i, min(i + 10, last))) for i in range(first, last, 10)]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for window in range(0, len(requests), workers):
+                batches = requests[window:window+workers]
+                for chunk_ids, chunks in zip(batches, executor.map(lambda chunk_ids: self._batch_get(manifest['date_id'], chunk_ids), batches)):
+                    missing = [chunk_id for chunk_id in chunk_ids if chunk_id not in chunks]
+                    if missing:
+                        raise ValueError(f"ChunkIDs {missing} of DateID {manifest['date_id']} are missing from {self.table_name}.")
+                    for chunk_id in chunk_ids:
+                        yield chunks[chunk_id]
+
+
+    def _download(self, manifest, file_path, workers):
+        """
+        Downloads a file with a manifest to the given path, checking it against the manifest.
+
+        Raises:
+            FileNotFoundError: If the file is still being uploaded.
+            ValueError: If the downloaded content does not match the size or checksum in the manifest.
+        """
+        if manifest['status'] != 'complete':
+            raise FileNotFoundError(f"File {manifest['file_name']} of DateID {manifest['date_id']} is still being uploaded.")
+
+        checksum = hashlib.sha256()
+        size = 0
+        with open(file_path, 'wb') as file:
+            for chunk in self._read_chunks(manifest, workers):
+                file.write(chunk)
+                checksum.update(chunk)
+                size += len(chunk)
+
+        if size != manifest['total_size'] or checksum.hexdigest() != manifest['checksum']:
+            raise ValueError(f"Downloaded content of DateID {manifest['date_id']} does not match its manifest.")
+
+        return file_path
+
+
+    def _query_chunks(self):
+        """
+        Yields the items of the unnamed file of the selected date in ChunkID order, one Query page at a time.
+        """
+        query_params = {
+            'TableName': self.table_name,
+            'KeyConditionExpression': 'DateID = :date AND ChunkID BETWEEN :first AND :last',
+            'ExpressionAttributeValues': {':date': {'N': str(self.selected_date)}, ':first': {'N': '0'}, ':last': {'N': str(SLOT_SIZE - 1)}}
+        }
+
+        while True:
+            response = self.dynamodb.query(**query_params)
+            yield from response.get('Items', [])
+
+            if 'LastEvaluatedKey' not in response:
+                break
+            query_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+    def download_file(self, output_dir, workers=4, file_name=None):
 
         """
         Downloads a file from DynamoDB and saves it to the output directory.
 
         Args:
             output_dir (str): The directory where the downloaded file will be saved.
+            workers (int): The number of BatchGetItem requests made in parallel.
+            file_name (str): The name of the file, saved as '{file_name}.parquet', or None for the unnamed file, saved as 'downloaded_file.parquet'.
 
+        Raises:
+            FileNotFoundError: If the named file is not stored for the selected date, or is still being uploaded.
+            ValueError: If the downloaded content does not match the size or checksum in the manifest.
         """
 
          # Create a directory to store the downloaded files
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
-        content_dict = {}
-        last_evaluated_key = {}
+        manifest = self.get_manifest(file_name)
+        file_path = os.path.join(output_dir, f'{file_name or "downloaded_file"}.parquet')
+        if manifest:
+            # Chunks are stored as native binary and checked against the manifest
+            self._download(manifest, file_path, workers)
+        elif file_name is not None:
+            raise FileNotFoundError(f"File {file_name} of DateID {self.selected_date} does not exist in {self.table_name}.")
+        else:
+            with open(file_path, 'wb') as file:
+                # Files in the original format are base64 text, returned sorted by ChunkID by the Query and decoded as they arrive.
+                # Base64 decodes in groups of 4 characters, so any remainder is carried over to the next chunk.
+                remainder = b''
+                for item in self._query_chunks():
+                    content = remainder + item['Binary']['B']
+                    cut = len(content) - len(content) % 4
+                    file.write(base64.b64decode(content[:cut]))
+                    remainder = content[cut:]
+                file.write(base64.b64decode(remainder))
 
-        while True:
-            scan_params = {
-                'TableName': self.table_name,
-                'FilterExpression': 'DateID = :date',
-                'ExpressionAttributeValues': {':date': {'N': str(self.selected_date)}}
-            }
+        print(f"Downloaded file to {file_path}")
 
-            if last_evaluated_key:
-                scan_params['ExclusiveStartKey'] = last_evaluated_key
 
-            response = self.dynamodb.scan(**scan_params)
+    def download_range(self, start_date, end_date, output_dir, workers=8):
 
-            items = response.get('Items', [])
+        """
+        Downloads every complete file of the catalog within a date range concurrently,
+        saving each one as '{output_dir}/{date}/{file_name}.parquet'.
 
-            for item in items:
-                chunk_id = item['ChunkID']['N']
-                content = base64.b64decode(item['Binary']['B'])
-                content_dict[chunk_id] = content
+        Args:
+            start_date (int): The first date in YYYYMMDD format.
+            end_date (int): The last date in YYYYMMDD format.
+            output_dir (str): The directory where the downloaded files will be saved.
+            workers (int): The number of files downloaded in parallel.
 
-            if 'LastEvaluatedKey' in response:
-                last_evaluated_key = response['LastEvaluatedKey']
-            else:
-                break
-        
-        # Sort the content_dict by ChunkID
-        sorted_content = {k: content_dict[k] for k in sorted(content_dict, key=lambda k: int(k))}
-        # Join the bytes inside the content
-        joined_content = b''.join(sorted_content.values())
-
-        # Write the concatenated content to a file in the specified output directory
-        file_path = os.path.join(output_dir, 'downloaded_file.parquet')
-        with open(file_path, 'wb') as file:
-            file.write(joined_content)
+        Returns:
+            list: The paths of the downloaded files.
+        """
+        files = [entry for entry in self.list_files(start_date, end_date) if entry['status'] == 'complete']
+        for date_id in {entry['date_id'] for entry in files}:
+            os.makedirs(os.path.join(output_dir, str(date_id)), exist_ok=True)
 
-        print(f"Downloaded file to {file_path}")
+        def download(entry):
+            file_path = os.path.join(output_dir, str(entry['date_id']), f'{entry["file_name"] or "downloaded_file"}.parquet')
+            return self._download(entry, file_path, 1)
+
+        # Files are downloaded in parallel, each one reading its chunks in order
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            paths = list(executor.map(download, files))
+
+        print(f"Downloaded {len(paths)} files from {start_date} to {end_date} to {output_dir}")
+
+        return paths
 
 
-manager = DynamoDBFileManager(aws_access_key_id='AWS_ACCESS_KEY_ID',
-                            aws_secret_access_key='AWS_SECRET_ACCESS_KEY',
-                            region_name='REGION',
-                            table_name='SELECTED_TABLE',
-                            selected_date=20231102 #YYYYMMDD
-                            )   
+if __name__ == '__main__':
+    manager = DynamoDBFileManager(aws_access_key_id='AWS_ACCESS_KEY_ID',
+                                aws_secret_access_key='AWS_SECRET_ACCESS_KEY',
+                                region_name='REGION',
+                                table_name='SELECTED_TABLE',
+                                selected_date=20231102 #YYYYMMDD
+                                )   
 
-manager.upload_file('data.csv')
-manager.download_file('output_directory')
+    manager.upload_file('data.csv')
+    manager.download_file('output_directory')
+    manager.upload_file('data.csv', file_name='data')
+    manager.download_range(20231101, 20231130, 'output_directory')
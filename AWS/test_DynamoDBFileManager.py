@@ -0,0 +1,62 @@
+import os
+import time
+import pandas as pd
+import pytest
+
+moto = pytest.importorskip('moto')
+
+from DynamoDBFileManager import DynamoDBFileManager, _AdaptiveRateLimiter
+
+
+def test_limiter_does_not_pace_before_throttling():
+    limiter = _AdaptiveRateLimiter(10)
+    start = time.monotonic()
+    for _ in range(100):
+        limiter.acquire(10000)
+    assert time.monotonic() - start < 1
+
+
+def test_limiter_cuts_rate_on_throttling_only():
+    limiter = _AdaptiveRateLimiter(10)
+    limiter.acquire(1000)
+    limiter.succeeded()
+    assert limiter.rate is None
+
+    limiter.throttled()
+    assert 10 <= limiter.rate <= 500
+    for _ in range(20):
+        limiter.throttled()
+    assert limiter.rate == 10
+
+
+@moto.mock_aws
+def test_upload_is_not_paced_by_provisioned_capacity(tmp_path, monkeypatch):
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    file_path = tmp_path / 'data.csv'
+    data = pd.DataFrame({'id': range(50000), 'value': [os.urandom(32).hex() for _ in range(50000)]})
+    data.to_csv(file_path, index=False)
+
+    # The table is created with 10 WCU, and the upload writes more than one 25-item batch of 50KB chunks,
+    # which the provisioned rate alone would space minutes apart.
+    manager = DynamoDBFileManager('key', 'secret', 'us-east-1', 'files', 20240101, chunk_size=50000)
+    start = time.monotonic()
+    stats = manager.upload_file(str(file_path), delimiter=',')
+    assert time.monotonic() - start < 60
+    assert stats['items'] > 25
+
+    manager.download_file(str(tmp_path))
+    assert pd.read_parquet(tmp_path / 'downloaded_file.parquet').equals(data)
+
+
+@moto.mock_aws
+def test_download_names_missing_chunks(tmp_path, monkeypatch):
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    file_path = tmp_path / 'data.csv'
+    pd.DataFrame({'id': range(20000), 'value': [os.urandom(16).hex() for _ in range(20000)]}).to_csv(file_path, index=False)
+
+    manager = DynamoDBFileManager('key', 'secret', 'us-east-1', 'files', 20240101, chunk_size=50000)
+    manager.upload_file(str(file_path), delimiter=',')
+    manager.dynamodb.delete_item(TableName='files', Key={'DateID': {'N': '20240101'}, 'ChunkID': {'N': '2'}})
+
+    with pytest.raises(ValueError, match=r'ChunkIDs \[2\]'):
+        manager.download_file(str(tmp_path))
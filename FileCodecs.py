@@ -0,0 +1,234 @@
+import itertools
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+"""
+File Codecs
+
+This module provides the compression codecs used by the SQL file managers to store file content.
+Content is compressed and decompressed in a streaming way, one chunk at a time, and the codec
+used for each file is recorded next to it so downloads can reverse it transparently.
+
+Codecs:
+    - 'none': Stores the content as is.
+    - 'gzip': Gzip compression from the standard library.
+    - 'zstd': Zstandard compression, requires the 'zstandard' package.
+    - 'lz4': LZ4 frame compression, requires the 'lz4' package.
+    - 'auto': Skips already compressed file types and uses 'zstd' (or 'gzip' if not installed) for the rest,
+      storing content as is when compression would not make it smaller.
+
+Functions:
+    - resolve_codec(codec:str, file_extension:str) -> str:
+        Resolves the codec to be used for a file.
+
+    - compress_chunks(chunks, codec:str) / decompress_chunks(chunks, codec:str):
+        Compress or decompress an iterable of byte chunks lazily.
+
+    - Decompressor(codec:str):
+        Decompresses chunks pushed one at a time, e.g. as they arrive from an async source.
+
+    - compress(data:bytes, codec:str) / decompress(data:bytes, codec:str):
+        Compress or decompress a whole payload.
+
+    - compress_auto(data:bytes, codec:str) -> tuple / auto_chunks(chunks, codec:str) -> tuple:
+        Apply the 'auto' fallback to 'none' for content that would not shrink.
+
+    - codec_report(codec:str, raw_bytes:int, stored_bytes:int, seconds:float) -> dict:
+        Summarizes the compression ratio and throughput of a transfer.
+"""
+
+CODECS = ('none', 'gzip', 'zstd', 'lz4')
+
+# File types whose content is already compressed and would not shrink any further
+COMPRESSED_EXTENSIONS = {
+    '.parquet', '.zip', '.gz', '.tgz', '.bz2', '.xz', '.zst', '.lz4', '.7z', '.rar',
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.mp3', '.mp4', '.avi', '.mkv', '.pdf', '.docx', '.xlsx'
+}
+
+
+def resolve_codec(codec:str, file_extension:str) -> str:
+    """
+    Resolves the codec to be used for a file, applying the 'auto' mode.
+
+    Args:
+    - codec: One of 'none', 'gzip', 'zstd', 'lz4' or 'auto'.
+    - file_extension: Extension of the file, including the leading dot.
+
+    Raises:
+    - ValueError: If the codec is unknown or its package is not installed.
+    """
+    if codec == 'auto':
+        if file_extension.lower() in COMPRESSED_EXTENSIONS:
+            return 'none'
+        return 'zstd' if zstandard else 'gzip'
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec '{codec}'. Choose one of {CODECS + ('auto',)}.")
+    if codec == 'zstd' and not zstandard:
+        raise ValueError("Codec 'zstd' requires the 'zstandard' package.")
+    if codec == 'lz4' and not lz4:
+        raise ValueError("Codec 'lz4' requires the 'lz4' package.")
+    return codec
+
+
+class _Compressor:
+    """Uniform streaming compressor over the codec libraries."""
+
+    def __init__(self, codec):
+        self.header = b''
+        if codec == 'gzip':
+            self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        elif codec == 'zstd':
+            self.compressor = zstandard.ZstdCompressor(level=3).compressobj()
+        elif codec == 'lz4':
+            self.compressor = lz4.frame.LZ4FrameCompressor()
+            self.header = self.compressor.begin()
+        else:
+            raise ValueError(f"Codec '{codec}' does not compress.")
+
+    def compress(self, data):
+        header, self.header = self.header, b''
+        return header + self.compressor.compress(data)
+
+    def flush(self):
+        header, self.header = self.header, b''
+        return header + self.compressor.flush()
+
+
+class Decompressor:
+    """
+    Uniform streaming decompressor over the codec libraries, for callers that push
+    chunks as they arrive instead of iterating over them. 'none' passes data through.
+    """
+
+    def __init__(self, codec):
+        if codec in (None, 'none'):
+            self.decompressor = None
+        elif codec == 'gzip':
+            self.decompressor = zlib.decompressobj(31)
+        elif codec == 'zstd':
+            self.decompressor = zstandard.ZstdDecompressor().decompressobj()
+        elif codec == 'lz4':
+            self.decompressor = lz4.frame.LZ4FrameDecompressor()
+        else:
+            raise ValueError(f"Codec '{codec}' does not decompress.")
+
+    def decompress(self, data):
+        if self.decompressor is None:
+            return bytes(data)
+        return self.decompressor.decompress(bytes(data))
+
+    def flush(self):
+        flush = getattr(self.decompressor, 'flush', None)
+        return flush() if flush else b''
+
+
+def compress_chunks(chunks, codec:str):
+    """
+    Compresses an iterable of byte chunks lazily, skipping empty outputs.
+
+    Args:
+    - chunks: Iterable of bytes.
+    - codec: Resolved codec name.
+    """
+    if codec in (None, 'none'):
+        yield from chunks
+        return
+
+    compressor = _Compressor(codec)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    compressed = compressor.flush()
+    if compressed:
+        yield compressed
+
+
+def decompress_chunks(chunks, codec:str):
+    """
+    Decompresses an iterable of byte chunks lazily, skipping empty outputs.
+
+    Args:
+    - chunks: Iterable of bytes.
+    - codec: Codec the chunks were compressed with.
+    """
+    if codec in (None, 'none'):
+        yield from chunks
+        return
+
+    decompressor = Decompressor(codec)
+    for chunk in chunks:
+        decompressed = decompressor.decompress(chunk)
+        if decompressed:
+            yield decompressed
+    decompressed = decompressor.flush()
+    if decompressed:
+        yield decompressed
+
+
+def compress(data:bytes, codec:str) -> bytes:
+    """Compresses a whole payload."""
+    return b''.join(compress_chunks([data], codec))
+
+
+def decompress(data:bytes, codec:str) -> bytes:
+    """Decompresses a whole payload."""
+    return b''.join(decompress_chunks([data], codec))
+
+
+def compress_auto(data:bytes, codec:str) -> tuple:
+    """
+    Compresses a whole payload in the 'auto' mode, keeping it as is when compression does not make it smaller.
+
+    Returns:
+    - Tuple of the stored payload and the codec it was stored with.
+    """
+    compressed = compress(data, codec)
+    if codec in (None, 'none') or len(compressed) < len(data):
+        return compressed, codec
+    return data, 'none'
+
+
+def auto_chunks(chunks, codec:str) -> tuple:
+    """
+    Picks the codec of an iterable of chunks in the 'auto' mode. Content that fits in its first chunk
+    is stored as is when compression does not make it smaller; longer content keeps the codec.
+
+    Returns:
+    - Tuple of an iterator over the same chunks and the codec to compress them with.
+    """
+    chunks = iter(chunks)
+    first = next(chunks, b'')
+    second = next(chunks, None)
+    if second is None:
+        return iter([first] if first else []), compress_auto(first, codec)[1]
+    return itertools.chain([first, second], chunks), codec
+
+
+def codec_report(codec:str, raw_bytes:int, stored_bytes:int, seconds:float) -> dict:
+    """
+    Summarizes the compression ratio and throughput of a transfer.
+
+    Args:
+    - codec: Codec used for the transfer.
+    - raw_bytes: Size of the original content.
+    - stored_bytes: Size of the content as stored.
+    - seconds: Duration of the transfer.
+    """
+    return {
+        'codec': codec,
+        'bytes': raw_bytes,
+        'stored_bytes': stored_bytes,
+        'ratio': raw_bytes / stored_bytes if stored_bytes else 1.0,
+        'seconds': seconds,
+        'mb_per_s': raw_bytes / (1024 * 1024) / seconds if seconds else 0.0,
+    }
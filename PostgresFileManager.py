@@ -1,10 +1,39 @@
+import hashlib
 import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
 import psycopg2.pool
+from psycopg2.extras import execute_values
+from FileCodecs import auto_chunks, codec_report, compress, compress_auto, compress_chunks, decompress, decompress_chunks, resolve_codec
+
+class _BinaryCopyStream:
+    """
+    File-like object that produces a PostgreSQL binary COPY stream from an iterable of byte pieces.
+
+    Pieces are pulled lazily as COPY reads, so only the current piece is held in memory.
+    """
+
+    def __init__(self, pieces):
+        self.pieces = iter(pieces)
+        self.buffer = b''
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            piece = next(self.pieces, None)
+            if piece is None:
+                break
+            self.buffer += piece
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
 
 class PostgresFileManager:
     """Handles file upload and download operations to a PostgreSQL database."""
 
-    def __init__(self, host, dbname, user, password, table=None):
+    def __init__(self, host, dbname, user, password, table=None, chunk_size=None, maxconn=5, codec='auto'):
         """
         Initializes the PostgresFileManager class with database connection details.
 
@@ -14,13 +43,21 @@ class PostgresFileManager:
         - user: Username for database access.
         - password: Password for the specified user.
         - table: Name of the table to be used for file storage. Default is 'file_table'.
+        - chunk_size: Size in bytes of each chunk in streaming mode. Default is 8MB.
+        - maxconn: Maximum number of pooled connections, which also caps the workers of bulk transfers. Default is 5.
+        - codec: Default compression codec of uploads ('none', 'gzip', 'zstd', 'lz4' or 'auto'). Default is 'auto'.
         """
         self.table = table or "file_table"
+        self.chunk_table = f"{self.table}_chunks"
+        self.chunk_size = chunk_size or 8 * 1024 * 1024
+        self.codec = codec
+
+        self.maxconn = maxconn
 
-        # Establishes a connection pool for database connections
-        self.connection_pool = psycopg2.pool.SimpleConnectionPool(
+        # Establishes a thread-safe connection pool for database connections
+        self.connection_pool = psycopg2.pool.ThreadedConnectionPool(
             minconn=1,
-            maxconn=5,
+            maxconn=self.maxconn,
             host=host,
             dbname=dbname,
             user=user,
@@ -39,7 +76,16 @@ class PostgresFileManager:
         self.connection_pool.putconn(conn)
 
     def create_table_if_not_exists(self):
-        """Creates the file storage table if it doesn't exist."""
+        """
+        Creates the file storage table if it doesn't exist.
+
+        Files uploaded in streaming mode keep an empty 'file' column and store their
+        content in a child table of fixed-size chunks keyed by (file_id, seq).
+
+        Every row records the SHA-256 hash of its content. Rows whose content was already
+        stored point to the row holding it through 'blob_id' instead of storing a copy.
+        The codec the content was compressed with is recorded in 'codec'.
+        """
         try:
             conn = self.get_connection()
             create_table_query = f'''
@@ -51,8 +97,34 @@ class PostgresFileManager:
                 file_extension VARCHAR
             )
             '''
+            # Adds the columns missing from tables created by earlier versions
+            alter_table_query = f'''
+            ALTER TABLE {self.table}
+                ADD COLUMN IF NOT EXISTS chunked BOOLEAN DEFAULT FALSE,
+                ADD COLUMN IF NOT EXISTS content_hash VARCHAR,
+                ADD COLUMN IF NOT EXISTS blob_id INTEGER REFERENCES {self.table} (id),
+                ADD COLUMN IF NOT EXISTS codec VARCHAR DEFAULT 'none'
+            '''
+            # Indexes the content hash for deduplication and the metadata columns used to list files
+            create_index_query = f'''
+            CREATE INDEX IF NOT EXISTS {self.table}_content_hash_idx ON {self.table} (content_hash);
+            CREATE INDEX IF NOT EXISTS {self.table}_file_name_idx ON {self.table} (file_name);
+            CREATE INDEX IF NOT EXISTS {self.table}_file_extension_idx ON {self.table} (file_extension);
+            CREATE INDEX IF NOT EXISTS {self.table}_timestamp_idx ON {self.table} (timestamp);
+            '''
+            create_chunk_table_query = f'''
+            CREATE TABLE IF NOT EXISTS {self.chunk_table} (
+                file_id INTEGER REFERENCES {self.table} (id) ON DELETE CASCADE,
+                seq INTEGER,
+                data BYTEA,
+                PRIMARY KEY (file_id, seq)
+            )
+            '''
             with conn.cursor() as cursor:
                 cursor.execute(create_table_query)
+                cursor.execute(alter_table_query)
+                cursor.execute(create_index_query)
+                cursor.execute(create_chunk_table_query)
                 conn.commit()
         except psycopg2.Error as e:
             # Handles any database errors
@@ -60,13 +132,22 @@ class PostgresFileManager:
         finally:
             self.release_connection(conn)
 
-    def upload_file(self, dir_path=None, file=None):
+    def upload_file(self, dir_path=None, file=None, chunked=False, codec=None):
         """
         Uploads a file to the database.
 
         Args:
         - dir_path: Directory path where the file is located. Default is the current working directory.
         - file: Name of the file to be uploaded.
+        - chunked: If True, streams the file in chunks of 'chunk_size' bytes, so memory use stays
+          bounded by the chunk size and the 1GB limit does not apply. Default is False.
+        - codec: Compression codec of the content. Default is the codec of the manager.
+
+        If a file with identical content was already uploaded, only its metadata is inserted
+        and it points to the existing content.
+
+        Returns:
+        - Dictionary with the codec, raw and stored sizes, compression ratio and throughput.
 
         Raises:
         - ValueError: If the file parameter is not provided or if the file size exceeds 1GB limit.
@@ -82,32 +163,115 @@ class PostgresFileManager:
         # Check file size
         file_size = os.path.getsize(file_path)
         max_size = 1000 * 1024 * 1024  # 1GB in bytes
-        if file_size > max_size:
+        if file_size > max_size and not chunked:
             raise ValueError("File size exceeds 1GB limit.")
 
+        auto = (codec or self.codec) == 'auto'
+        codec = resolve_codec(codec or self.codec, file_extension)
+        start = time.perf_counter()
+        content_hash = self._hash_file(file_path)
+        stored_bytes = 0
+
+        conn = self.get_connection()
         try:
-            conn = self.get_connection()
             with conn.cursor() as cursor:
-                with open(file_path, 'rb') as file_obj:
-                    file_data = file_obj.read()
+                blob_id = self._find_blob(cursor, content_hash)
+                if blob_id:
+                    # Point to the stored content, with the codec and layout it was stored with
+                    insert_query = f"""
+                    INSERT INTO {self.table} (file_name, file_extension, content_hash, blob_id, codec, chunked)
+                    SELECT %s, %s, content_hash, id, codec, chunked FROM {self.table} WHERE id = %s
+                    RETURNING codec
+                    """
+                    cursor.execute(insert_query, (file_name, file_extension, blob_id))
+                    codec = cursor.fetchone()[0]
+                elif chunked:
+                    insert_query = f"INSERT INTO {self.table} (file_name, file_extension, content_hash, codec, chunked) VALUES (%s, %s, %s, %s, TRUE) RETURNING id"
+                    cursor.execute(insert_query, (file_name, file_extension, content_hash, codec))
+                    file_id = cursor.fetchone()[0]
+
+                    with open(file_path, 'rb') as file_obj:
+                        stored_bytes, codec = self._write_chunks(cursor, file_id, file_obj, codec, auto)
+                    if auto:
+                        cursor.execute(f"UPDATE {self.table} SET codec = %s WHERE id = %s", (codec, file_id))
+                else:
+                    # Content that 'auto' would not shrink is stored as is
+                    with open(file_path, 'rb') as file_obj:
+                        if auto:
+                            file_data, codec = compress_auto(file_obj.read(), codec)
+                        else:
+                            file_data = compress(file_obj.read(), codec)
+                    stored_bytes = len(file_data)
 
-                insert_query = f"INSERT INTO {self.table} (file, file_name, file_extension) VALUES (%s, %s, %s)"
-                cursor.execute(insert_query, (file_data, file_name, file_extension))
+                    insert_query = f"INSERT INTO {self.table} (file, file_name, file_extension, content_hash, codec) VALUES (%s, %s, %s, %s, %s)"
+                    cursor.execute(insert_query, (file_data, file_name, file_extension, content_hash, codec))
             conn.commit()
-            self.release_connection(conn)
-            print("File uploaded successfully.")
         except (psycopg2.Error, IOError) as e:
             # Handles database or IO errors
+            conn.rollback()
             raise e
+        finally:
+            self.release_connection(conn)
+
+        report = codec_report(codec, file_size, stored_bytes, time.perf_counter() - start)
+        if blob_id:
+            print(f"File content already stored with ID {blob_id}, metadata uploaded successfully.")
+        else:
+            print(f"File uploaded successfully ({codec}, ratio {report['ratio']:.2f}x, {report['mb_per_s']:.2f} MB/s).")
+        return report
+
+    def _hash_file(self, file_path):
+        """Computes the SHA-256 hash of a file, reading it in chunks of 'chunk_size' bytes."""
+        content_hash = hashlib.sha256()
+        with open(file_path, 'rb') as file_obj:
+            for chunk in iter(lambda: file_obj.read(self.chunk_size), b''):
+                content_hash.update(chunk)
+        return content_hash.hexdigest()
+
+    def _find_blob(self, cursor, content_hash):
+        """Returns the ID of the row holding content with the given hash, or None if not stored yet."""
+        select_query = f"SELECT id FROM {self.table} WHERE content_hash = %s AND blob_id IS NULL LIMIT 1"
+        cursor.execute(select_query, (content_hash,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def _write_chunks(self, cursor, file_id, file_obj, codec, auto=False):
+        """
+        Writes the content of a file object to the chunk table, one chunk at a time.
+
+        Args:
+        - cursor: Cursor of the connection holding the upload transaction.
+        - file_id: ID of the file row the chunks belong to.
+        - file_obj: Binary file object to read from.
+        - codec: Codec the chunks are compressed with.
+        - auto: Whether the codec was picked by 'auto', which stores content as is when it would not shrink.
+
+        Returns:
+        - Tuple of the number of bytes stored and the codec they were stored with.
+        """
+        insert_query = f"INSERT INTO {self.chunk_table} (file_id, seq, data) VALUES (%s, %s, %s)"
+        chunks = iter(lambda: file_obj.read(self.chunk_size), b'')
+        if auto:
+            chunks, codec = auto_chunks(chunks, codec)
+        stored_bytes = 0
+        for seq, chunk in enumerate(compress_chunks(chunks, codec)):
+            cursor.execute(insert_query, (file_id, seq, chunk))
+            stored_bytes += len(chunk)
+        return stored_bytes, codec
 
     def download_file(self, file_id=None, download_path=None):
         """
         Downloads a file from the database.
 
+        Files uploaded in streaming mode are read back chunk by chunk through a server-side cursor.
+
         Args:
         - file_id: ID of the file to be downloaded.
         - download_path: Directory path where the file will be downloaded. Default is the current working directory.
 
+        Returns:
+        - Path of the downloaded file, or None if the file was not found.
+
         Raises:
         - ValueError: If the file_id parameter is not provided.
         """
@@ -115,28 +279,480 @@ class PostgresFileManager:
             raise ValueError("Required 'file_id'.")
         download_path = download_path or os.getcwd()
 
+        download_file_path = None
+        conn = self.get_connection()
         try:
-            conn = self.get_connection()
             with conn.cursor() as cursor:
-                select_query = f"SELECT file, file_name, file_extension FROM {self.table} WHERE id = %s"
+                # Resolves deduplicated rows to the row holding their content
+                select_query = f"""
+                SELECT blob.id, blob.file, meta.file_name, meta.file_extension, blob.chunked, blob.codec
+                FROM {self.table} AS meta
+                JOIN {self.table} AS blob ON blob.id = COALESCE(meta.blob_id, meta.id)
+                WHERE meta.id = %s
+                """
                 cursor.execute(select_query, (file_id,))
                 file_data = cursor.fetchone()
 
-                if file_data:
-                    file_content, file_name, file_extension = file_data
-                    full_file_name = f"{file_name}{file_extension}"
+            if file_data:
+                blob_id, file_content, file_name, file_extension, chunked, codec = file_data
+                full_file_name = f"{file_name}{file_extension}"
 
-                    download_file_path = os.path.join(download_path, full_file_name)
+                download_file_path = os.path.join(download_path, full_file_name)
 
-                    with open(download_file_path, 'wb') as file:
-                        file.write(file_content)
-                    print(f"File '{full_file_name}' with ID {file_id} downloaded successfully.")
-                else:
-                    print(f"File with ID {file_id} not found.")
+                with open(download_file_path, 'wb') as file:
+                    if chunked:
+                        self._read_chunks(conn, blob_id, file, codec)
+                    else:
+                        file.write(decompress(bytes(file_content), codec))
+                print(f"File '{full_file_name}' with ID {file_id} downloaded successfully.")
+            else:
+                print(f"File with ID {file_id} not found.")
+            conn.commit()
+        except (psycopg2.Error, IOError) as e:
+            # Handles database or IO errors
+            conn.rollback()
+            raise e
+        finally:
+            self.release_connection(conn)
+
+        return download_file_path
+
+    def _read_chunks(self, conn, file_id, file_obj, codec):
+        """
+        Streams the chunks of a file to a file object in sequence order, decompressing them on the way.
+
+        A named (server-side) cursor fetches a few chunks per round-trip, so only those
+        are held in memory at any time.
+
+        Args:
+        - conn: Connection holding the download transaction.
+        - file_id: ID of the file row the chunks belong to.
+        - file_obj: Binary file object to write to.
+        - codec: Codec the chunks were compressed with.
+        """
+        with conn.cursor(name=f"{self.chunk_table}_{file_id}") as cursor:
+            cursor.itersize = 4
+            select_query = f"SELECT data FROM {self.chunk_table} WHERE file_id = %s ORDER BY seq"
+            cursor.execute(select_query, (file_id,))
+            for chunk in decompress_chunks((row[0] for row in cursor), codec):
+                file_obj.write(chunk)
+
+    def upload_many(self, paths=None, workers=None, codec=None):
+        """
+        Uploads many files in parallel, each streamed in chunks on its own pooled connection.
+
+        Files are hashed in parallel first. The metadata rows of all files are then inserted
+        in batches, with files whose content is already stored pointing to the existing content,
+        and the workers fill in the chunks of the rest. New content only gets its hash in the
+        transaction that stores its chunks, so it cannot be deduplicated against before it is complete.
+        Files repeated within the batch point to their content once it is uploaded, and rows of
+        files that fail are removed afterwards.
+
+        Args:
+        - paths: List of file paths to be uploaded.
+        - workers: Number of parallel uploads. Default and maximum is 'maxconn'.
+        - codec: Compression codec of the content. Default is the codec of the manager.
+
+        Returns:
+        - Dictionary with the per-file 'results' and the overall throughput 'stats'.
+
+        Raises:
+        - ValueError: If the paths parameter is not provided.
+        """
+        if not paths:
+            raise ValueError("Required 'paths'.")
+        paths = list(paths)
+        workers = min(workers or self.maxconn, self.maxconn)
+        codecs = [resolve_codec(codec or self.codec, os.path.splitext(path)[1]) for path in paths]
+        start = time.perf_counter()
+
+        def _hash(path):
+            try:
+                return self._hash_file(path)
+            except IOError:
+                return None
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            hashes = list(executor.map(_hash, paths))
+
+        def _metadata(index):
+            path = paths[index]
+            return str(os.path.splitext(os.path.basename(path))[0]), str(os.path.splitext(path)[1]), hashes[index]
+
+        conn = self.get_connection()
+        try:
+            with conn.cursor() as cursor:
+                select_query = f"""
+                SELECT content_hash, MIN(id) FROM {self.table}
+                WHERE content_hash = ANY(%s) AND blob_id IS NULL
+                GROUP BY content_hash
+                """
+                cursor.execute(select_query, (list({content_hash for content_hash in hashes if content_hash}),))
+                blob_ids = dict(cursor.fetchall())
+
+                # The first occurrence of new content is uploaded, every other occurrence points to it
+                owners, duplicates, batch_duplicates, owned_hashes = [], [], [], set()
+                for index, content_hash in enumerate(hashes):
+                    if content_hash is None:
+                        continue
+                    if content_hash in blob_ids:
+                        duplicates.append(index)
+                    elif content_hash in owned_hashes:
+                        batch_duplicates.append(index)
+                    else:
+                        owners.append(index)
+                        owned_hashes.add(content_hash)
+
+                file_ids = {}
+                if owners:
+                    # The hash is set along with the chunks, once the content is complete
+                    insert_query = f"INSERT INTO {self.table} (file_name, file_extension, content_hash, codec, chunked) VALUES %s RETURNING id"
+                    rows = execute_values(cursor, insert_query, [(*_metadata(index)[:2], None, codecs[index], True) for index in owners], fetch=True)
+                    for index, row in zip(owners, rows):
+                        file_ids[index] = blob_ids[hashes[index]] = row[0]
+                if duplicates:
+                    self._insert_duplicates(cursor, [(*_metadata(index), blob_ids[hashes[index]]) for index in duplicates], duplicates, file_ids)
+            conn.commit()
+        except psycopg2.Error as e:
+            conn.rollback()
+            raise e
+        finally:
             self.release_connection(conn)
+
+        def _upload(index):
+            task_start = time.perf_counter()
+            path = paths[index]
+            conn = self.get_connection()
+            try:
+                with conn.cursor() as cursor:
+                    with open(path, 'rb') as file_obj:
+                        stored_bytes, file_codec = self._write_chunks(cursor, file_ids[index], file_obj, codecs[index], (codec or self.codec) == 'auto')
+                    cursor.execute(f"UPDATE {self.table} SET content_hash = %s, codec = %s WHERE id = %s", (hashes[index], file_codec, file_ids[index]))
+                conn.commit()
+                result = {'path': path, 'id': file_ids[index], 'bytes': os.path.getsize(path), 'stored_bytes': stored_bytes, 'deduplicated': False, 'error': None}
+            except (psycopg2.Error, IOError) as e:
+                conn.rollback()
+                result = {'path': path, 'id': None, 'bytes': 0, 'stored_bytes': 0, 'deduplicated': False, 'error': str(e)}
+            finally:
+                self.release_connection(conn)
+            result['seconds'] = time.perf_counter() - task_start
+            return result
+
+        results = [
+            {'path': path, 'id': None, 'bytes': 0, 'stored_bytes': 0, 'deduplicated': False, 'error': "File could not be read.", 'seconds': 0.0}
+            for path in paths
+        ]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for index, result in zip(owners, executor.map(_upload, owners)):
+                results[index] = result
+
+        # Files repeated within the batch point to their content once it is uploaded,
+        # and the metadata rows of the files that could not be uploaded are removed
+        failed_ids = [file_ids[index] for index in owners if results[index]['error']]
+        uploaded = [index for index in batch_duplicates if blob_ids[hashes[index]] not in failed_ids]
+        if failed_ids or uploaded:
+            conn = self.get_connection()
+            try:
+                with conn.cursor() as cursor:
+                    if uploaded:
+                        self._insert_duplicates(cursor, [(*_metadata(index), blob_ids[hashes[index]]) for index in uploaded], uploaded, file_ids)
+                    if failed_ids:
+                        cursor.execute(f"DELETE FROM {self.table} WHERE id = ANY(%s)", (failed_ids,))
+                conn.commit()
+            except psycopg2.Error as e:
+                conn.rollback()
+                raise e
+            finally:
+                self.release_connection(conn)
+        for index in duplicates + batch_duplicates:
+            if index in file_ids:
+                results[index] = {'path': paths[index], 'id': file_ids[index], 'bytes': 0, 'stored_bytes': 0, 'deduplicated': True, 'error': None, 'seconds': 0.0}
+            else:
+                results[index] = {'path': paths[index], 'id': None, 'bytes': 0, 'stored_bytes': 0, 'deduplicated': True, 'error': "Content upload failed.", 'seconds': 0.0}
+
+        stats = self._transfer_stats(results, time.perf_counter() - start)
+        stats['deduplicated'] = sum(1 for result in results if result['deduplicated'] and not result['error'])
+        stats['stored_bytes'] = sum(result['stored_bytes'] for result in results)
+        stats['ratio'] = stats['bytes'] / stats['stored_bytes'] if stats['stored_bytes'] else 1.0
+        print(f"Uploaded {stats['files']} files ({stats['deduplicated']} deduplicated, {stats['failed']} failed) at {stats['mb_per_s']:.2f} MB/s, ratio {stats['ratio']:.2f}x.")
+        return {'results': results, 'stats': stats}
+
+    def _insert_duplicates(self, cursor, rows, indexes, file_ids):
+        """
+        Inserts the metadata rows of files pointing to stored content, recording their IDs by index.
+        The codec and chunked flag of each row are copied from the row holding its content.
+        """
+        cursor.execute(f"SELECT id, codec, chunked FROM {self.table} WHERE id = ANY(%s)", (list({row[3] for row in rows}),))
+        blobs = {row[0]: row[1:] for row in cursor.fetchall()}
+        rows = [(*row, *blobs[row[3]]) for row in rows]
+        insert_query = f"INSERT INTO {self.table} (file_name, file_extension, content_hash, blob_id, codec, chunked) VALUES %s RETURNING id"
+        for index, row in zip(indexes, execute_values(cursor, insert_query, rows, fetch=True)):
+            file_ids[index] = row[0]
+
+    def download_many(self, file_ids=None, download_path=None, workers=None):
+        """
+        Downloads many files in parallel, each on its own pooled connection.
+
+        Args:
+        - file_ids: List of IDs of the files to be downloaded.
+        - download_path: Directory path where the files will be downloaded. Default is the current working directory.
+        - workers: Number of parallel downloads. Default and maximum is 'maxconn'.
+
+        Returns:
+        - Dictionary with the per-file 'results' and the overall throughput 'stats'.
+
+        Raises:
+        - ValueError: If the file_ids parameter is not provided.
+        """
+        if not file_ids:
+            raise ValueError("Required 'file_ids'.")
+        workers = min(workers or self.maxconn, self.maxconn)
+        start = time.perf_counter()
+
+        def _download(file_id):
+            task_start = time.perf_counter()
+            try:
+                path = self.download_file(file_id, download_path)
+                if path:
+                    result = {'id': file_id, 'path': path, 'bytes': os.path.getsize(path), 'error': None}
+                else:
+                    result = {'id': file_id, 'path': None, 'bytes': 0, 'error': 'File not found.'}
+            except (psycopg2.Error, IOError) as e:
+                result = {'id': file_id, 'path': None, 'bytes': 0, 'error': str(e)}
+            result['seconds'] = time.perf_counter() - task_start
+            return result
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_download, file_ids))
+
+        stats = self._transfer_stats(results, time.perf_counter() - start)
+        print(f"Downloaded {stats['files']} files ({stats['failed']} failed) at {stats['mb_per_s']:.2f} MB/s.")
+        return {'results': results, 'stats': stats}
+
+    def copy_files(self, paths=None):
+        """
+        Uploads many files in a single round-trip through COPY ... FROM STDIN in binary format.
+
+        Paths are consumed lazily and each file is streamed in chunks of 'chunk_size' bytes,
+        so payloads are never materialized in memory. All files are loaded in one transaction.
+        The content hash is computed while streaming and recorded, but since content is sent
+        before its hash is known, this path does not deduplicate. Content is stored uncompressed.
+
+        Args:
+        - paths: Iterable (e.g. a generator) of file paths to be uploaded.
+
+        Returns:
+        - Dictionary with the rows loaded and the rows/s and MB/s throughput.
+
+        Raises:
+        - ValueError: If the paths parameter is not provided or if a file size exceeds 1GB limit.
+        """
+        if paths is None:
+            raise ValueError("Required 'paths'.")
+        stats = {'rows': 0, 'bytes': 0}
+        start = time.perf_counter()
+
+        copy_query = f"COPY {self.table} (file, content_hash, file_name, file_extension) FROM STDIN WITH (FORMAT binary)"
+        conn = self.get_connection()
+        try:
+            with conn.cursor() as cursor:
+                stream = _BinaryCopyStream(self._copy_rows(paths, stats))
+                cursor.copy_expert(copy_query, stream, size=self.chunk_size)
+            conn.commit()
         except (psycopg2.Error, IOError) as e:
             # Handles database or IO errors
+            conn.rollback()
             raise e
+        finally:
+            self.release_connection(conn)
+
+        seconds = time.perf_counter() - start
+        stats.update({
+            'seconds': seconds,
+            'rows_per_s': stats['rows'] / seconds if seconds else 0.0,
+            'mb_per_s': stats['bytes'] / (1024 * 1024) / seconds if seconds else 0.0,
+        })
+        print(f"Copied {stats['rows']} files at {stats['rows_per_s']:.2f} rows/s, {stats['mb_per_s']:.2f} MB/s.")
+        return stats
+
+    def _copy_rows(self, paths, stats):
+        """
+        Yields the binary COPY encoding of one (file, content_hash, file_name, file_extension) row per path.
+
+        Args:
+        - paths: Iterable of file paths.
+        - stats: Dictionary updated in place with the rows and bytes produced.
+        """
+        max_size = 1000 * 1024 * 1024  # 1GB in bytes
+
+        # Signature, flags field and header extension length
+        yield b'PGCOPY\n\xff\r\n\x00' + struct.pack('!ii', 0, 0)
+
+        for path in paths:
+            file_name = str(os.path.splitext(os.path.basename(path))[0]).encode('utf-8')
+            file_extension = str(os.path.splitext(path)[1]).encode('utf-8')
+
+            with open(path, 'rb') as file_obj:
+                file_size = os.fstat(file_obj.fileno()).st_size
+                if file_size > max_size:
+                    raise ValueError(f"File '{path}' exceeds 1GB limit.")
+
+                # Field count and length of the file field, followed by its content
+                yield struct.pack('!hi', 4, file_size)
+                content_hash = hashlib.sha256()
+                remaining = file_size
+                for chunk in iter(lambda: file_obj.read(min(self.chunk_size, remaining)), b''):
+                    remaining -= len(chunk)
+                    content_hash.update(chunk)
+                    yield chunk
+                if remaining:
+                    raise IOError(f"File '{path}' changed size while being copied.")
+
+            content_hash = content_hash.hexdigest().encode('utf-8')
+            yield struct.pack('!i', len(content_hash)) + content_hash
+
+            yield struct.pack('!i', len(file_name)) + file_name
+            yield struct.pack('!i', len(file_extension)) + file_extension
+
+            stats['rows'] += 1
+            stats['bytes'] += file_size
+
+        # File trailer
+        yield struct.pack('!h', -1)
+
+    def list_files(self, filters=None, order=None, page=1, page_size=100):
+        """
+        Lists the stored files from their metadata columns only, without reading any content.
+
+        Args:
+        - filters: Dictionary with any of 'file_name' (supports % wildcards), 'file_extension',
+          'since' and 'until' (timestamp range, 'until' excluded). Default is no filter.
+        - order: Column to order by, one of 'id', 'timestamp', 'file_name' or 'file_extension',
+          optionally followed by 'ASC' or 'DESC'. Default is 'id'.
+        - page: Page number, starting at 1.
+        - page_size: Number of files per page. Default is 100.
+
+        Returns:
+        - List of dictionaries with the metadata of each file.
+
+        Raises:
+        - ValueError: If a filter or the order is not supported.
+        """
+        filter_clauses = {
+            'file_name': "file_name LIKE %s",
+            'file_extension': "file_extension = %s",
+            'since': "timestamp >= %s",
+            'until': "timestamp < %s",
+        }
+        filters = filters or {}
+        unknown = set(filters) - set(filter_clauses)
+        if unknown:
+            raise ValueError(f"Unsupported filters: {sorted(unknown)}.")
+
+        order_column, _, direction = (order or 'id').partition(' ')
+        direction = direction.strip().upper() or 'ASC'
+        if order_column not in ('id', 'timestamp', 'file_name', 'file_extension') or direction not in ('ASC', 'DESC'):
+            raise ValueError(f"Unsupported order '{order}'.")
+
+        where = ' AND '.join(filter_clauses[key] for key in filters) or 'TRUE'
+        select_query = f"""
+        SELECT id, timestamp, file_name, file_extension, codec, content_hash, blob_id, chunked
+        FROM {self.table}
+        WHERE {where}
+        ORDER BY {order_column} {direction}, id
+        LIMIT %s OFFSET %s
+        """
+
+        conn = self.get_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(select_query, (*filters.values(), page_size, (max(page, 1) - 1) * page_size))
+                columns = [column.name for column in cursor.description]
+                files = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            conn.commit()
+        finally:
+            self.release_connection(conn)
+
+        return files
+
+    def read_range(self, file_id=None, offset=0, length=None):
+        """
+        Reads part of a stored file with substring(), without fetching the whole content.
+
+        Files stored in chunked mode only read the chunks overlapping the range.
+
+        Args:
+        - file_id: ID of the file to read.
+        - offset: Position of the first byte to read, starting at 0.
+        - length: Number of bytes to read.
+
+        Returns:
+        - The bytes read, or None if the file was not found.
+
+        Raises:
+        - ValueError: If the file_id or length parameters are not provided, or if the content is compressed.
+        """
+        if not file_id or length is None:
+            raise ValueError("Required 'file_id' and 'length'.")
+
+        conn = self.get_connection()
+        try:
+            with conn.cursor() as cursor:
+                # Resolves deduplicated rows to the row holding their content
+                select_query = f"""
+                SELECT blob.id, blob.chunked, blob.codec
+                FROM {self.table} AS meta
+                JOIN {self.table} AS blob ON blob.id = COALESCE(meta.blob_id, meta.id)
+                WHERE meta.id = %s
+                """
+                cursor.execute(select_query, (file_id,))
+                file_data = cursor.fetchone()
+                if not file_data:
+                    print(f"File with ID {file_id} not found.")
+                    return None
+
+                blob_id, chunked, codec = file_data
+                if codec not in (None, 'none'):
+                    raise ValueError(f"File with ID {file_id} is compressed with '{codec}', range reads need codec 'none'.")
+
+                if not chunked:
+                    range_query = f"SELECT substring(file FROM %s FOR %s) FROM {self.table} WHERE id = %s"
+                    cursor.execute(range_query, (offset + 1, length, blob_id))
+                    return bytes(cursor.fetchone()[0] or b'')
+
+                # Locates the chunks overlapping the range from their sizes
+                cursor.execute(f"SELECT seq, octet_length(data) FROM {self.chunk_table} WHERE file_id = %s ORDER BY seq", (blob_id,))
+                chunk_sizes = cursor.fetchall()
+
+                range_query = f"SELECT substring(data FROM %s FOR %s) FROM {self.chunk_table} WHERE file_id = %s AND seq = %s"
+                pieces, position = [], 0
+                for seq, size in chunk_sizes:
+                    start, end = max(offset - position, 0), min(offset + length - position, size)
+                    if start < end:
+                        cursor.execute(range_query, (start + 1, end - start, blob_id, seq))
+                        pieces.append(bytes(cursor.fetchone()[0]))
+                    position += size
+                    if position >= offset + length:
+                        break
+            conn.commit()
+        finally:
+            self.release_connection(conn)
+
+        return b''.join(pieces)
+
+    @staticmethod
+    def _transfer_stats(results, seconds):
+        """Summarizes the per-file results of a bulk transfer into throughput figures."""
+        succeeded = [result for result in results if not result['error']]
+        total_bytes = sum(result['bytes'] for result in succeeded)
+        return {
+            'files': len(succeeded),
+            'failed': len(results) - len(succeeded),
+            'bytes': total_bytes,
+            'seconds': seconds,
+            'files_per_s': len(succeeded) / seconds if seconds else 0.0,
+            'mb_per_s': total_bytes / (1024 * 1024) / seconds if seconds else 0.0,
+        }
 
 # Example usage
 postgres = PostgresFileManager(
@@ -147,4 +763,24 @@ postgres = PostgresFileManager(
                 )
 
 postgres.upload_file(file = 'file.csv') 
+postgres.upload_file(file = 'file.csv', codec='gzip')
 postgres.download_file(1)
+
+# Streams a large file in chunks instead of reading it in memory
+postgres.upload_file(file = 'large_file.csv', chunked=True)
+postgres.download_file(2)
+
+# Uploads and downloads many files in parallel over the connection pool
+bulk_upload = postgres.upload_many(['data/file_1.csv', 'data/file_2.csv', 'data/file_3.csv'], workers=3)
+postgres.download_many([result['id'] for result in bulk_upload['results'] if result['id']], 'downloads', workers=3)
+
+# Loads many files in one COPY round-trip, reading the paths lazily
+copy_stats = postgres.copy_files(os.path.join('data', file) for file in os.listdir('data'))
+
+# Lists the latest CSV files without reading their content
+latest_csvs = postgres.list_files(filters={'file_extension': '.csv'}, order='timestamp DESC', page=1, page_size=20)
+
+# Reads the first kilobyte of a file stored without compression
+postgres.upload_file(file = 'file.json', codec='none')
+json_file = postgres.list_files(filters={'file_name': 'file', 'file_extension': '.json'})[0]
+postgres.read_range(json_file['id'], offset=0, length=1024)
@@ -1,33 +1,83 @@
 import libsql_client
+import aiohttp
+import asyncio
+import hashlib
 import os
+import time
+from FileCodecs import Decompressor, auto_chunks, codec_report, compress, compress_auto, compress_chunks, decompress, decompress_chunks, resolve_codec
+
+# Codes of the errors libsql_client reports when its connection or stream was lost
+CONNECTION_ERROR_CODES = {'CLIENT_CLOSED', 'HRANA_WEBSOCKET_ERROR', 'STREAM_CLOSED'}
+
+def _is_connection_error(error):
+    """
+    Tells whether an exception is a connection or transport failure, rather than an error
+    reported by the database or a programming error.
+    """
+
+    if isinstance(error, libsql_client.LibsqlError):
+        return getattr(error, 'code', None) in CONNECTION_ERROR_CODES
+    return isinstance(error, (OSError, asyncio.TimeoutError, aiohttp.ClientError))
+
+def _is_read(statement):
+    """
+    Tells whether a statement, given as SQL text, a (sql, args) tuple or a Statement, only reads.
+    """
+
+    sql = statement[0] if isinstance(statement, tuple) else getattr(statement, 'sql', statement)
+    return sql.lstrip().split(None, 1)[0].upper() in ('SELECT', 'PRAGMA')
 
 class TursoFileManager:
-    def __init__(self, url, auth_token, table=None):
+    def __init__(self, url, auth_token, table=None, codec='auto', batch_bytes=None, chunk_size=None, chunks_per_batch=8):
         """
         Initializes the TursoFileManager with the specified parameters.
 
+        A single client is kept open across calls. It connects lazily on first use, reconnects
+        if the connection is lost and is closed by disconnect_from_database() or by leaving a
+        'with' block.
+
         Args:
         - url (str): URL of the database.
         - auth_token (str): Authentication token for accessing the database.
         - table (str, optional): Name of the table for file storage. Defaults to 'file_table'.
+        - codec (str, optional): Default compression codec of uploads ('none', 'gzip', 'zstd', 'lz4' or 'auto'). Defaults to 'auto'.
+        - batch_bytes (int, optional): Maximum size of the file content packed into one batch by upload_many and download_many. Defaults to 32MB.
+        - chunk_size (int, optional): Size in bytes of each chunk of files stored in chunked mode. Defaults to 1MB.
+        - chunks_per_batch (int, optional): Number of chunks written or read per round-trip in chunked mode. Defaults to 8.
         """
 
         self.url = url
         self.auth_token = auth_token
+        self.codec = codec
+        self.batch_bytes = batch_bytes or 32 * 1024 * 1024
+        self.chunk_size = chunk_size or 1024 * 1024
+        self.chunks_per_batch = chunks_per_batch
 
         self.table = table or "file_table"
+        self.chunk_table = f"{self.table}_chunks"
         self.client_sync = None
         self.create_table_if_not_exists()
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.disconnect_from_database()
+
     def connect_to_database(self):
         """
-        Connects to the database using the provided URL and authentication token.
+        Connects to the database using the provided URL and authentication token, unless already connected.
+
+        Returns:
+        - The connected client.
         """
 
-        self.client_sync = libsql_client.create_client_sync(
-            url=self.url,
-            auth_token=self.auth_token
-        )
+        if self.client_sync is None or self.client_sync.closed:
+            self.client_sync = libsql_client.create_client_sync(
+                url=self.url,
+                auth_token=self.auth_token
+            )
+        return self.client_sync
         
     def disconnect_from_database(self):
         """
@@ -35,14 +85,57 @@ class TursoFileManager:
         """
 
         if self.client_sync:
-            self.client_sync.close()
+            try:
+                self.client_sync.close()
+            finally:
+                self.client_sync = None
+
+    def _execute(self, statement, args=None):
+        """
+        Executes a statement on the open client, reconnecting if the connection was lost.
+
+        Only reads are sent again after a connection failure, since a write may already have
+        been applied when the failure was reported.
+        """
+
+        try:
+            return self.connect_to_database().execute(statement, args)
+        except Exception as error:
+            if not _is_connection_error(error):
+                raise
+            self.disconnect_from_database()
+            if not _is_read(statement):
+                raise
+            return self.connect_to_database().execute(statement, args)
+
+    def _batch(self, statements):
+        """
+        Executes many statements in a single round-trip and transaction, reconnecting if the connection was lost.
+
+        The batch is only sent again after a connection failure if all of its statements are reads.
+        """
+
+        try:
+            return self.connect_to_database().batch(statements)
+        except Exception as error:
+            if not _is_connection_error(error):
+                raise
+            self.disconnect_from_database()
+            if not all(_is_read(statement) for statement in statements):
+                raise
+            return self.connect_to_database().batch(statements)
 
     def create_table_if_not_exists(self):
         """
         Creates the table for file storage if it doesn't exist.
-        """
 
-        self.connect_to_database()
+        Every row records the SHA-256 hash of its content. Rows whose content was already
+        stored point to the row holding it through 'blob_id' instead of storing a copy.
+        The codec the content was compressed with is recorded in 'codec'.
+
+        Files stored in chunked mode keep an empty 'file' column and store their content
+        in a child table of chunks keyed by (file_id, seq).
+        """
 
         create_table_query = f"""
         CREATE TABLE IF NOT EXISTS {self.table} (
@@ -53,17 +146,52 @@ class TursoFileManager:
             file_extension TEXT
         )
         """
-        self.client_sync.execute(create_table_query)
+        _, table_info = self._batch([create_table_query, f"PRAGMA table_info({self.table})"])
 
-        self.disconnect_from_database()
+        # Adds the columns missing from tables created by earlier versions
+        columns = {
+            'content_hash': 'TEXT',
+            'blob_id': f'INTEGER REFERENCES {self.table} (id)',
+            'codec': "TEXT DEFAULT 'none'",
+            'chunked': 'INTEGER DEFAULT 0',
+        }
+        existing_columns = {row[1] for row in table_info}
+        statements = [
+            f"ALTER TABLE {self.table} ADD COLUMN {column} {column_type}"
+            for column, column_type in columns.items() if column not in existing_columns
+        ]
 
-    def upload_file(self, dir_path=None, file=None):
+        # Index the content hash for deduplication and the metadata columns used to list files
+        statements.extend(
+            f"CREATE INDEX IF NOT EXISTS {self.table}_{column}_idx ON {self.table} ({column})"
+            for column in ('content_hash', 'file_name', 'file_extension', 'timestamp')
+        )
+        statements.append(f"""
+        CREATE TABLE IF NOT EXISTS {self.chunk_table} (
+            file_id INTEGER REFERENCES {self.table} (id),
+            seq INTEGER,
+            data BLOB,
+            PRIMARY KEY (file_id, seq)
+        )
+        """)
+        self._batch(statements)
+
+    def upload_file(self, dir_path=None, file=None, codec=None, chunked=False):
         """
         Uploads a file to the database.
         
         Args:
         - dir_path (str, optional): Directory path of the file. Defaults to current working directory.
         - file (str): Name of the file to upload.
+        - codec (str, optional): Compression codec of the content. Defaults to the codec of the manager.
+        - chunked (bool, optional): If True, streams the file in chunks of 'chunk_size' bytes written in batched
+          transactions, so memory stays flat and the 1GB limit does not apply. Defaults to False.
+
+        If a file with identical content was already uploaded, only its metadata is inserted
+        and it points to the existing content.
+
+        Returns:
+        - dict: Codec, raw and stored sizes, compression ratio and throughput of the upload.
         
         Raises:
         - ValueError: If the file parameter is not provided or if the file size exceeds 1GB limit.
@@ -80,32 +208,137 @@ class TursoFileManager:
         file_size = os.path.getsize(file_path)
         max_size = 1000 * 1024 * 1024  # 1GB in bytes
 
-        if file_size > max_size:
+        if file_size > max_size and not chunked:
             raise ValueError("File size exceeds 1GB limit.")      
 
         # Extract file name and extension
         file_name, file_extension = os.path.splitext(file)
+        auto = (codec or self.codec) == 'auto'
+        codec = resolve_codec(codec or self.codec, file_extension)
+        start = time.perf_counter()
+
+        # Read file content, or only hash it in chunked mode
+        if chunked:
+            content_hash = self._hash_file(file_path)
+        else:
+            with open(file_path, 'rb') as file_obj:
+                file_data = file_obj.read()
+            content_hash = hashlib.sha256(file_data).hexdigest()
+        stored_bytes = 0
+
+        # Look for a row already holding the same content
+        select_query = f"""
+        SELECT id, codec FROM {self.table}
+        WHERE content_hash = ? AND blob_id IS NULL
+        LIMIT 1
+        """
+        result = self._execute(select_query, (content_hash,))
+
+        if result:
+            # Insert only the file details, pointing to the existing content with its codec and layout
+            blob_id, codec = result[0]
+            insert_query = f"""
+            INSERT INTO {self.table} (file_name, file_extension, content_hash, blob_id, codec, chunked)
+            SELECT ?, ?, content_hash, id, codec, chunked FROM {self.table} WHERE id = ?
+            """
+            self._execute(insert_query, (file_name, file_extension, blob_id))
+        elif chunked:
+            stored_bytes, codec = self._upload_chunks(file_path, file_name, file_extension, content_hash, codec, auto)
+        else:
+            # Compress the content and insert file details into the database, as is if 'auto' would not shrink it
+            if auto:
+                file_data, codec = compress_auto(file_data, codec)
+            else:
+                file_data = compress(file_data, codec)
+            stored_bytes = len(file_data)
+            insert_query = f"""
+            INSERT INTO {self.table} (file, file_name, file_extension, content_hash, codec) 
+            VALUES (?, ?, ?, ?, ?)
+            """
+            self._execute(insert_query, (file_data, file_name, file_extension, content_hash, codec))
 
-        # Connect to the database
-        self.connect_to_database()
+        report = codec_report(codec, file_size, stored_bytes, time.perf_counter() - start)
+        print(f"File '{file}' uploaded ({codec}, ratio {report['ratio']:.2f}x, {report['mb_per_s']:.2f} MB/s).")
+        return report
 
-        # Read file content
+    def _hash_file(self, file_path):
+        """
+        Computes the SHA-256 hash of a file, reading it in chunks of 'chunk_size' bytes.
+        """
+
+        content_hash = hashlib.sha256()
         with open(file_path, 'rb') as file_obj:
-            file_data = file_obj.read()
+            for chunk in iter(lambda: file_obj.read(self.chunk_size), b''):
+                content_hash.update(chunk)
+        return content_hash.hexdigest()
+
+    def _upload_chunks(self, file_path, file_name, file_extension, content_hash, codec, auto=False):
+        """
+        Stores a file in the chunk table, writing 'chunks_per_batch' chunks per batched transaction.
+
+        The content hash and codec are set in the last batch, so deduplication never points to a partially
+        uploaded file. If the upload fails, the rows written so far are removed.
+
+        Returns:
+        - tuple: Number of bytes stored, and the codec they were stored with.
+        """
 
-        # Insert file details into the database
         insert_query = f"""
-        INSERT INTO {self.table} (file, file_name, file_extension) 
-        VALUES (?, ?, ?)
+        INSERT INTO {self.table} (file_name, file_extension, codec, chunked)
+        VALUES (?, ?, ?, 1)
         """
-        self.client_sync.execute(insert_query, (file_data, file_name, file_extension))
-        
-        # Disconnect from the database
-        self.disconnect_from_database()
+        file_id = self._execute(insert_query, (file_name, file_extension, codec)).last_insert_rowid
+
+        insert_chunk_query = f"INSERT INTO {self.chunk_table} (file_id, seq, data) VALUES (?, ?, ?)"
+        statements, stored_bytes = [], 0
+        try:
+            with open(file_path, 'rb') as file_obj:
+                chunks = iter(lambda: file_obj.read(self.chunk_size), b'')
+                if auto:
+                    chunks, codec = auto_chunks(chunks, codec)
+                for seq, chunk in enumerate(compress_chunks(chunks, codec)):
+                    statements.append((insert_chunk_query, (file_id, seq, chunk)))
+                    stored_bytes += len(chunk)
+                    if len(statements) == self.chunks_per_batch:
+                        self._batch(statements)
+                        statements = []
+
+            statements.append((f"UPDATE {self.table} SET content_hash = ?, codec = ? WHERE id = ?", (content_hash, codec, file_id)))
+            self._batch(statements)
+        except Exception:
+            self._batch([
+                (f"DELETE FROM {self.chunk_table} WHERE file_id = ?", (file_id,)),
+                (f"DELETE FROM {self.table} WHERE id = ?", (file_id,))
+            ])
+            raise
+
+        return stored_bytes, codec
+
+    def _iter_chunks(self, file_id):
+        """
+        Yields the chunks of a file in sequence order, fetching 'chunks_per_batch' chunks per round-trip.
+        """
+
+        select_query = f"""
+        SELECT seq, data FROM {self.chunk_table}
+        WHERE file_id = ? AND seq >= ?
+        ORDER BY seq
+        LIMIT ?
+        """
+        next_seq = 0
+        while True:
+            result = self._execute(select_query, (file_id, next_seq, self.chunks_per_batch))
+            if not result:
+                return
+            for seq, data in result:
+                yield data
+            next_seq = seq + 1
 
     def download_file(self, file_id=None, download_path=None):
         """
         Downloads a file from the database.
+
+        Files stored in chunked mode are streamed to disk a batch of chunks at a time.
         
         Args:
         - file_id (int): ID of the file to download.
@@ -114,35 +347,305 @@ class TursoFileManager:
 
         if not file_id:
             raise ValueError("Required 'file_id'.")
-
-        # Connect to the database
-        self.connect_to_database()
         
         # Set default download directory if not provided
         download_path = download_path or os.getcwd()
         
-        # Prepare SQL query to retrieve file details
+        # Prepare SQL query to retrieve file details, resolving deduplicated rows to the row holding their content
         select_query = f"""
-        SELECT file, file_name, file_extension 
-        FROM {self.table} 
-        WHERE id = ?
+        SELECT blob.file, meta.file_name, meta.file_extension, blob.codec, blob.id, blob.chunked 
+        FROM {self.table} AS meta
+        JOIN {self.table} AS blob ON blob.id = COALESCE(meta.blob_id, meta.id)
+        WHERE meta.id = ?
         """
-        result = self.client_sync.execute(select_query, (file_id,))
+        result = self._execute(select_query, (file_id,))
 
         if result:
-            file_content, file_name, file_extension = result[0]
+            file_content, file_name, file_extension, codec, blob_id, chunked = result[0]
             full_file_name = f"{file_name}{file_extension}"
             download_file_path = os.path.join(download_path, full_file_name)
 
             # Write file content to the specified download path
             with open(download_file_path, 'wb') as file:
-                file.write(file_content)
+                if chunked:
+                    for chunk in decompress_chunks(self._iter_chunks(blob_id), codec):
+                        file.write(chunk)
+                else:
+                    file.write(decompress(file_content, codec))
             print(f"File '{full_file_name}' with ID {file_id} downloaded successfully.")
         else:
             print(f"File with ID {file_id} not found.")
-        
-        # Disconnect from the database
-        self.disconnect_from_database()
+
+    def upload_many(self, files=None, dir_path=None, codec=None):
+        """
+        Uploads many files, packing their inserts into batches executed in a single round-trip each.
+
+        Files are read batch by batch, so at most 'batch_bytes' of content is held in memory.
+        Files whose content is already stored, or repeated within the batch, only get their
+        metadata inserted, pointing to the existing content.
+
+        Args:
+        - files (list): Names of the files to upload.
+        - dir_path (str, optional): Directory path of the files. Defaults to current working directory.
+        - codec (str, optional): Compression codec of the content. Defaults to the codec of the manager.
+
+        Returns:
+        - list: One dictionary per file with its ID, raw and stored sizes and whether it was deduplicated.
+
+        Raises:
+        - ValueError: If the files parameter is not provided or if a file size exceeds 1GB limit.
+        """
+
+        if not files:
+            raise ValueError("Required 'files'.")
+
+        dir_path = dir_path or os.getcwd()
+        max_size = 1000 * 1024 * 1024  # 1GB in bytes
+        start = time.perf_counter()
+
+        results, pending, pending_bytes = [], [], 0
+        for file in files:
+            file_path = os.path.join(dir_path, file)
+            file_size = os.path.getsize(file_path)
+            if file_size > max_size:
+                raise ValueError(f"File '{file}' exceeds 1GB limit.")
+
+            # Send the pending files before the batch grows past its size limit
+            if pending and pending_bytes + file_size > self.batch_bytes:
+                results.extend(self._upload_batch(pending, codec))
+                pending, pending_bytes = [], 0
+
+            with open(file_path, 'rb') as file_obj:
+                pending.append((file, file_obj.read()))
+            pending_bytes += file_size
+
+        if pending:
+            results.extend(self._upload_batch(pending, codec))
+
+        report = codec_report(
+            'mixed',
+            sum(result['bytes'] for result in results),
+            sum(result['stored_bytes'] for result in results),
+            time.perf_counter() - start
+        )
+        print(f"Uploaded {len(results)} files (ratio {report['ratio']:.2f}x, {report['mb_per_s']:.2f} MB/s).")
+        return results
+
+    def _upload_batch(self, pending, codec):
+        """
+        Inserts a batch of files in a single round-trip, after one lookup for already stored content.
+
+        Args:
+        - pending (list): Tuples of file name and raw content.
+        - codec (str): Compression codec of the content, or None for the codec of the manager.
+        """
+
+        hashes = [hashlib.sha256(file_data).hexdigest() for _, file_data in pending]
+
+        select_query = f"""
+        SELECT DISTINCT content_hash FROM {self.table}
+        WHERE content_hash IN ({', '.join('?' for _ in hashes)}) AND blob_id IS NULL
+        """
+        stored_hashes = {row[0] for row in self._execute(select_query, hashes)}
+
+        statements, results = [], []
+        for (file, file_data), content_hash in zip(pending, hashes):
+            file_name, file_extension = os.path.splitext(file)
+            if content_hash in stored_hashes:
+                # Point to the row holding the content, which may be inserted earlier in this batch, with its codec and layout
+                insert_query = f"""
+                INSERT INTO {self.table} (file_name, file_extension, content_hash, blob_id, codec, chunked)
+                SELECT ?, ?, content_hash, id, codec, chunked FROM {self.table}
+                WHERE content_hash = ? AND blob_id IS NULL
+                ORDER BY id LIMIT 1
+                """
+                statements.append((insert_query, (file_name, file_extension, content_hash)))
+                results.append({'file': file, 'bytes': len(file_data), 'stored_bytes': 0, 'deduplicated': True})
+            else:
+                file_codec = resolve_codec(codec or self.codec, file_extension)
+                if (codec or self.codec) == 'auto':
+                    stored_data, file_codec = compress_auto(file_data, file_codec)
+                else:
+                    stored_data = compress(file_data, file_codec)
+                insert_query = f"""
+                INSERT INTO {self.table} (file, file_name, file_extension, content_hash, codec)
+                VALUES (?, ?, ?, ?, ?)
+                """
+                statements.append((insert_query, (stored_data, file_name, file_extension, content_hash, file_codec)))
+                results.append({'file': file, 'bytes': len(file_data), 'stored_bytes': len(stored_data), 'deduplicated': False})
+                stored_hashes.add(content_hash)
+
+        for result, result_set in zip(results, self._batch(statements)):
+            result['id'] = result_set.last_insert_rowid
+        return results
+
+    def download_many(self, file_ids=None, download_path=None):
+        """
+        Downloads many files, fetching them in a single round-trip per batch of 'batch_bytes' of content.
+
+        Args:
+        - file_ids (list): IDs of the files to download.
+        - download_path (str, optional): Directory path to save the downloaded files. Defaults to current working directory.
+
+        Returns:
+        - list: Paths of the downloaded files. Files not found are skipped.
+        """
+
+        if not file_ids:
+            raise ValueError("Required 'file_ids'.")
+
+        download_path = download_path or os.getcwd()
+        file_ids = list(file_ids)
+
+        # Sizes are read first, so that the content of each batch stays within 'batch_bytes'
+        size_query = f"""
+        SELECT meta.id, LENGTH(blob.file)
+        FROM {self.table} AS meta
+        JOIN {self.table} AS blob ON blob.id = COALESCE(meta.blob_id, meta.id)
+        WHERE meta.id IN ({', '.join('?' for _ in file_ids)})
+        """
+        sizes = {row[0]: row[1] or 0 for row in self._execute(size_query, file_ids)}
+
+        batches, batch, batch_bytes = [], [], 0
+        for file_id in file_ids:
+            if file_id not in sizes:
+                print(f"File with ID {file_id} not found.")
+                continue
+            if batch and batch_bytes + sizes[file_id] > self.batch_bytes:
+                batches.append(batch)
+                batch, batch_bytes = [], 0
+            batch.append(file_id)
+            batch_bytes += sizes[file_id]
+        if batch:
+            batches.append(batch)
+
+        download_file_paths = []
+        for batch in batches:
+            select_query = f"""
+            SELECT blob.file, meta.file_name, meta.file_extension, blob.codec, blob.id, blob.chunked
+            FROM {self.table} AS meta
+            JOIN {self.table} AS blob ON blob.id = COALESCE(meta.blob_id, meta.id)
+            WHERE meta.id IN ({', '.join('?' for _ in batch)})
+            """
+            for file_content, file_name, file_extension, codec, blob_id, chunked in self._execute(select_query, batch):
+                download_file_path = os.path.join(download_path, f"{file_name}{file_extension}")
+                with open(download_file_path, 'wb') as file:
+                    if chunked:
+                        # Chunked files are not part of the batch content and are streamed separately
+                        for chunk in decompress_chunks(self._iter_chunks(blob_id), codec):
+                            file.write(chunk)
+                    else:
+                        file.write(decompress(file_content, codec))
+                download_file_paths.append(download_file_path)
+
+        print(f"Downloaded {len(download_file_paths)} files.")
+        return download_file_paths
+
+    def list_files(self, filters=None, order=None, page=1, page_size=100):
+        """
+        Lists the stored files from their metadata columns only, without reading any content.
+
+        Args:
+        - filters (dict, optional): Any of 'file_name' (supports % wildcards), 'file_extension',
+          'since' and 'until' (timestamp range, 'until' excluded). Defaults to no filter.
+        - order (str, optional): Column to order by, one of 'id', 'timestamp', 'file_name' or
+          'file_extension', optionally followed by 'ASC' or 'DESC'. Defaults to 'id'.
+        - page (int, optional): Page number, starting at 1.
+        - page_size (int, optional): Number of files per page. Defaults to 100.
+
+        Returns:
+        - list: Dictionaries with the metadata of each file.
+
+        Raises:
+        - ValueError: If a filter or the order is not supported.
+        """
+
+        filter_clauses = {
+            'file_name': "file_name LIKE ?",
+            'file_extension': "file_extension = ?",
+            'since': "timestamp >= ?",
+            'until': "timestamp < ?",
+        }
+        filters = filters or {}
+        unknown = set(filters) - set(filter_clauses)
+        if unknown:
+            raise ValueError(f"Unsupported filters: {sorted(unknown)}.")
+
+        order_column, _, direction = (order or 'id').partition(' ')
+        direction = direction.strip().upper() or 'ASC'
+        if order_column not in ('id', 'timestamp', 'file_name', 'file_extension') or direction not in ('ASC', 'DESC'):
+            raise ValueError(f"Unsupported order '{order}'.")
+
+        where = ' AND '.join(filter_clauses[key] for key in filters) or '1'
+        select_query = f"""
+        SELECT id, timestamp, file_name, file_extension, codec, content_hash, blob_id, chunked
+        FROM {self.table}
+        WHERE {where}
+        ORDER BY {order_column} {direction}, id
+        LIMIT ? OFFSET ?
+        """
+        result = self._execute(select_query, (*filters.values(), page_size, (max(page, 1) - 1) * page_size))
+        return [dict(zip(result.columns, row)) for row in result]
+
+    def read_range(self, file_id=None, offset=0, length=None):
+        """
+        Reads part of a stored file with substr(), without fetching the whole content.
+
+        Files stored in chunked mode only read the chunks overlapping the range.
+
+        Args:
+        - file_id (int): ID of the file to read.
+        - offset (int, optional): Position of the first byte to read, starting at 0.
+        - length (int): Number of bytes to read.
+
+        Returns:
+        - bytes: The bytes read, or None if the file was not found.
+
+        Raises:
+        - ValueError: If the file_id or length parameters are not provided, or if the content is compressed.
+        """
+
+        if not file_id or length is None:
+            raise ValueError("Required 'file_id' and 'length'.")
+
+        # Resolve deduplicated rows to the row holding their content
+        select_query = f"""
+        SELECT blob.id, blob.chunked, blob.codec
+        FROM {self.table} AS meta
+        JOIN {self.table} AS blob ON blob.id = COALESCE(meta.blob_id, meta.id)
+        WHERE meta.id = ?
+        """
+        result = self._execute(select_query, (file_id,))
+        if not result:
+            print(f"File with ID {file_id} not found.")
+            return None
+
+        blob_id, chunked, codec = result[0]
+        if codec not in (None, 'none'):
+            raise ValueError(f"File with ID {file_id} is compressed with '{codec}', range reads need codec 'none'.")
+
+        if not chunked:
+            range_query = f"SELECT substr(file, ?, ?) FROM {self.table} WHERE id = ?"
+            return self._execute(range_query, (offset + 1, length, blob_id))[0][0] or b''
+
+        # Locate the chunks overlapping the range from their sizes, then read them in one batch
+        chunk_sizes = self._execute(
+            f"SELECT seq, length(data) FROM {self.chunk_table} WHERE file_id = ? ORDER BY seq",
+            (blob_id,)
+        )
+        range_query = f"SELECT substr(data, ?, ?) FROM {self.chunk_table} WHERE file_id = ? AND seq = ?"
+        statements, position = [], 0
+        for seq, size in chunk_sizes:
+            start, end = max(offset - position, 0), min(offset + length - position, size)
+            if start < end:
+                statements.append((range_query, (start + 1, end - start, blob_id, seq)))
+            position += size
+            if position >= offset + length:
+                break
+
+        if not statements:
+            return b''
+        return b''.join(result_set[0][0] for result_set in self._batch(statements))
 
     def drop_table(self, table_to_delete=None):
         """
@@ -152,19 +655,428 @@ class TursoFileManager:
         if not table_to_delete:
             raise ValueError("Required 'table_to_delete'.")
 
-        self.connect_to_database()
-
         drop_table_query = f"DROP TABLE IF EXISTS {table_to_delete}"
-        self.client_sync.execute(drop_table_query)
+        self._execute(drop_table_query)
 
-        self.disconnect_from_database()
+class AsyncTursoFileManager:
+    def __init__(self, url, auth_token, table=None, codec='auto', concurrency=16):
+        """
+        Initializes the AsyncTursoFileManager, the asyncio counterpart of TursoFileManager.
+
+        Uploads and downloads are coroutines, file reads, writes and compression run off the
+        event loop, and upload_many/download_many keep up to 'concurrency' transfers in flight.
+        A 'file:' URL runs against a local libsql/SQLite database file.
+
+        Args:
+        - url (str): URL of the database.
+        - auth_token (str): Authentication token for accessing the database.
+        - table (str, optional): Name of the table for file storage. Defaults to 'file_table'.
+        - codec (str, optional): Default compression codec of uploads ('none', 'gzip', 'zstd', 'lz4' or 'auto'). Defaults to 'auto'.
+        - concurrency (int, optional): Maximum number of transfers in flight in upload_many and download_many. Defaults to 16.
+        """
+
+        self.url = url
+        self.auth_token = auth_token
+        self.codec = codec
+        self.concurrency = concurrency
+        self.chunks_per_batch = 8
+
+        self.table = table or "file_table"
+        self.chunk_table = f"{self.table}_chunks"
+        self.client = None
+        self.table_ready = False
+
+    async def __aenter__(self):
+        await self.connect_to_database()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.disconnect_from_database()
+
+    async def connect_to_database(self):
+        """
+        Connects to the database unless already connected, creating the table on first connection.
+
+        Returns:
+        - The connected client.
+        """
+
+        if self.client is None or self.client.closed:
+            self.client = libsql_client.create_client(
+                url=self.url,
+                auth_token=self.auth_token
+            )
+        if not self.table_ready:
+            # Marked ready first, since creating the table executes through this method
+            self.table_ready = True
+            try:
+                await self.create_table_if_not_exists()
+            except Exception:
+                self.table_ready = False
+                raise
+        return self.client
+
+    async def disconnect_from_database(self):
+        """
+        Disconnects from the database.
+        """
+
+        if self.client:
+            try:
+                await self.client.close()
+            finally:
+                self.client = None
+
+    async def _execute(self, statement, args=None):
+        """
+        Executes a statement, reconnecting if the connection was lost.
+
+        Only reads are sent again after a connection failure, as in TursoFileManager._execute.
+        """
+
+        try:
+            return await (await self.connect_to_database()).execute(statement, args)
+        except Exception as error:
+            if not _is_connection_error(error):
+                raise
+            await self.disconnect_from_database()
+            if not _is_read(statement):
+                raise
+            return await (await self.connect_to_database()).execute(statement, args)
+
+    async def _batch(self, statements):
+        """
+        Executes many statements in a single round-trip and transaction, reconnecting if the connection was lost.
+
+        The batch is only sent again after a connection failure if all of its statements are reads.
+        """
+
+        try:
+            return await (await self.connect_to_database()).batch(statements)
+        except Exception as error:
+            if not _is_connection_error(error):
+                raise
+            await self.disconnect_from_database()
+            if not all(_is_read(statement) for statement in statements):
+                raise
+            return await (await self.connect_to_database()).batch(statements)
+
+    async def create_table_if_not_exists(self):
+        """
+        Creates the table for file storage if it doesn't exist, with the same layout as TursoFileManager.
+        """
+
+        create_table_query = f"""
+        CREATE TABLE IF NOT EXISTS {self.table} (
+            id INTEGER PRIMARY KEY,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            file BLOB,
+            file_name TEXT,
+            file_extension TEXT
+        )
+        """
+        _, table_info = await self._batch([create_table_query, f"PRAGMA table_info({self.table})"])
+
+        # Adds the columns missing from tables created by earlier versions
+        columns = {
+            'content_hash': 'TEXT',
+            'blob_id': f'INTEGER REFERENCES {self.table} (id)',
+            'codec': "TEXT DEFAULT 'none'",
+            'chunked': 'INTEGER DEFAULT 0',
+        }
+        existing_columns = {row[1] for row in table_info}
+        statements = [
+            f"ALTER TABLE {self.table} ADD COLUMN {column} {column_type}"
+            for column, column_type in columns.items() if column not in existing_columns
+        ]
+
+        # Index the content hash for deduplication and the metadata columns used to list files
+        statements.extend(
+            f"CREATE INDEX IF NOT EXISTS {self.table}_{column}_idx ON {self.table} ({column})"
+            for column in ('content_hash', 'file_name', 'file_extension', 'timestamp')
+        )
+        statements.append(f"""
+        CREATE TABLE IF NOT EXISTS {self.chunk_table} (
+            file_id INTEGER REFERENCES {self.table} (id),
+            seq INTEGER,
+            data BLOB,
+            PRIMARY KEY (file_id, seq)
+        )
+        """)
+        await self._batch(statements)
+
+    @staticmethod
+    def _read_file(file_path):
+        """Reads a file and hashes its content. Runs in an executor, off the event loop."""
+
+        with open(file_path, 'rb') as file_obj:
+            file_data = file_obj.read()
+        return file_data, hashlib.sha256(file_data).hexdigest()
+
+    @staticmethod
+    def _write_file(file_path, file_content, codec):
+        """Decompresses and writes a file. Runs in an executor, off the event loop."""
+
+        with open(file_path, 'wb') as file:
+            file.write(decompress(file_content, codec))
+
+    @staticmethod
+    def _write_decompressed(file, decompressor, chunks):
+        """Decompresses and writes a batch of chunks. Runs in an executor, off the event loop."""
+
+        for chunk in chunks:
+            file.write(decompressor.decompress(chunk))
+
+    async def _write_chunks(self, file_path, file_id, codec):
+        """
+        Streams the chunks of a file stored in chunked mode to disk, one batch of chunks at a time.
+        """
+
+        select_query = f"""
+        SELECT seq, data FROM {self.chunk_table}
+        WHERE file_id = ? AND seq >= ?
+        ORDER BY seq
+        LIMIT ?
+        """
+        loop = asyncio.get_running_loop()
+        decompressor = Decompressor(codec)
+        next_seq = 0
+        with open(file_path, 'wb') as file:
+            while True:
+                result = await self._execute(select_query, (file_id, next_seq, self.chunks_per_batch))
+                if not result:
+                    break
+                chunks = [data for _, data in result]
+                await loop.run_in_executor(None, self._write_decompressed, file, decompressor, chunks)
+                next_seq = result[len(result) - 1][0] + 1
+            await loop.run_in_executor(None, file.write, decompressor.flush())
+
+    async def upload_file(self, dir_path=None, file=None, codec=None):
+        """
+        Uploads a file to the database.
+
+        Args:
+        - dir_path (str, optional): Directory path of the file. Defaults to current working directory.
+        - file (str): Name of the file to upload.
+        - codec (str, optional): Compression codec of the content. Defaults to the codec of the manager.
+
+        If a file with identical content was already uploaded, only its metadata is inserted
+        and it points to the existing content.
+
+        Returns:
+        - dict: Codec, raw and stored sizes, compression ratio and throughput of the upload.
+
+        Raises:
+        - ValueError: If the file parameter is not provided or if the file size exceeds 1GB limit.
+        """
+
+        if not file:
+            raise ValueError("File parameter is required.")
+
+        dir_path = dir_path or os.getcwd()
+        file_path = os.path.join(dir_path, file)
+
+        # Check file size
+        file_size = os.path.getsize(file_path)
+        max_size = 1000 * 1024 * 1024  # 1GB in bytes
+
+        if file_size > max_size:
+            raise ValueError("File size exceeds 1GB limit.")
+
+        file_name, file_extension = os.path.splitext(file)
+        auto = (codec or self.codec) == 'auto'
+        codec = resolve_codec(codec or self.codec, file_extension)
+        start = time.perf_counter()
+
+        loop = asyncio.get_running_loop()
+        file_data, content_hash = await loop.run_in_executor(None, self._read_file, file_path)
+        stored_bytes = 0
+
+        # Look for a row already holding the same content
+        select_query = f"""
+        SELECT id, codec FROM {self.table}
+        WHERE content_hash = ? AND blob_id IS NULL
+        LIMIT 1
+        """
+        result = await self._execute(select_query, (content_hash,))
+
+        if result:
+            # Insert only the file details, pointing to the existing content with its codec and layout
+            blob_id, codec = result[0]
+            insert_query = f"""
+            INSERT INTO {self.table} (file_name, file_extension, content_hash, blob_id, codec, chunked)
+            SELECT ?, ?, content_hash, id, codec, chunked FROM {self.table} WHERE id = ?
+            """
+            await self._execute(insert_query, (file_name, file_extension, blob_id))
+        else:
+            # Compress the content off the event loop and insert file details into the database, as is if 'auto' would not shrink it
+            if auto:
+                file_data, codec = await loop.run_in_executor(None, compress_auto, file_data, codec)
+            else:
+                file_data = await loop.run_in_executor(None, compress, file_data, codec)
+            stored_bytes = len(file_data)
+            insert_query = f"""
+            INSERT INTO {self.table} (file, file_name, file_extension, content_hash, codec)
+            VALUES (?, ?, ?, ?, ?)
+            """
+            await self._execute(insert_query, (file_data, file_name, file_extension, content_hash, codec))
+
+        return codec_report(codec, file_size, stored_bytes, time.perf_counter() - start)
+
+    async def download_file(self, file_id=None, download_path=None):
+        """
+        Downloads a file from the database.
+
+        Args:
+        - file_id (int): ID of the file to download.
+        - download_path (str, optional): Directory path to save the downloaded file. Defaults to current working directory.
+
+        Returns:
+        - str: Path of the downloaded file, or None if the file was not found.
+        """
+
+        if not file_id:
+            raise ValueError("Required 'file_id'.")
+
+        download_path = download_path or os.getcwd()
+
+        # Resolve deduplicated rows to the row holding their content
+        select_query = f"""
+        SELECT blob.file, meta.file_name, meta.file_extension, blob.codec, blob.id, blob.chunked
+        FROM {self.table} AS meta
+        JOIN {self.table} AS blob ON blob.id = COALESCE(meta.blob_id, meta.id)
+        WHERE meta.id = ?
+        """
+        result = await self._execute(select_query, (file_id,))
+
+        if not result:
+            print(f"File with ID {file_id} not found.")
+            return None
+
+        file_content, file_name, file_extension, codec, blob_id, chunked = result[0]
+        download_file_path = os.path.join(download_path, f"{file_name}{file_extension}")
+        if chunked:
+            await self._write_chunks(download_file_path, blob_id, codec)
+        else:
+            await asyncio.get_running_loop().run_in_executor(None, self._write_file, download_file_path, file_content, codec)
+        return download_file_path
+
+    async def _gather_bounded(self, coroutines, concurrency):
+        """Runs coroutines concurrently, with at most 'concurrency' of them in flight at once."""
+
+        semaphore = asyncio.Semaphore(concurrency or self.concurrency)
+
+        async def _bounded(coroutine):
+            async with semaphore:
+                return await coroutine
+
+        return await asyncio.gather(*(_bounded(coroutine) for coroutine in coroutines))
+
+    async def upload_many(self, files=None, dir_path=None, codec=None, concurrency=None):
+        """
+        Uploads many files concurrently.
+
+        Args:
+        - files (list): Names of the files to upload.
+        - dir_path (str, optional): Directory path of the files. Defaults to current working directory.
+        - codec (str, optional): Compression codec of the content. Defaults to the codec of the manager.
+        - concurrency (int, optional): Maximum number of uploads in flight. Defaults to the concurrency of the manager.
+
+        Returns:
+        - list: Upload report of each file, in the order of 'files'.
+        """
+
+        if not files:
+            raise ValueError("Required 'files'.")
+
+        # Connect once up front, so concurrent uploads share the client
+        await self.connect_to_database()
+        start = time.perf_counter()
+        reports = await self._gather_bounded(
+            (self.upload_file(dir_path, file, codec) for file in files),
+            concurrency
+        )
+
+        report = codec_report(
+            'mixed',
+            sum(report['bytes'] for report in reports),
+            sum(report['stored_bytes'] for report in reports),
+            time.perf_counter() - start
+        )
+        print(f"Uploaded {len(reports)} files (ratio {report['ratio']:.2f}x, {report['mb_per_s']:.2f} MB/s).")
+        return reports
+
+    async def download_many(self, file_ids=None, download_path=None, concurrency=None):
+        """
+        Downloads many files concurrently.
+
+        Args:
+        - file_ids (list): IDs of the files to download.
+        - download_path (str, optional): Directory path to save the downloaded files. Defaults to current working directory.
+        - concurrency (int, optional): Maximum number of downloads in flight. Defaults to the concurrency of the manager.
+
+        Returns:
+        - list: Path of each downloaded file, or None for files not found, in the order of 'file_ids'.
+        """
+
+        if not file_ids:
+            raise ValueError("Required 'file_ids'.")
+
+        await self.connect_to_database()
+        download_file_paths = await self._gather_bounded(
+            (self.download_file(file_id, download_path) for file_id in file_ids),
+            concurrency
+        )
+        print(f"Downloaded {sum(1 for path in download_file_paths if path)} files.")
+        return download_file_paths
+
+    async def drop_table(self, table_to_delete=None):
+        """
+        Drops the specified table from the database.
+        """
+
+        if not table_to_delete:
+            raise ValueError("Required 'table_to_delete'.")
+
+        await self._execute(f"DROP TABLE IF EXISTS {table_to_delete}")
 
 # Example usage
-turso = TursoFileManager(
+with TursoFileManager(
     url="your_turso_url",
     auth_token="your_turso_auth_token"
-    )
+    ) as turso:
+
+    turso.upload_file(file='data.csv')
+    turso.upload_file(file='data.parquet', codec='auto')  # Already compressed, stored as is
+    turso.download_file(file_id=1)
+
+    # Large files are stored in chunks and streamed back to disk
+    turso.upload_file(file='large_data.csv', chunked=True)
+
+    # List the latest CSV files without reading their content
+    latest_csvs = turso.list_files(filters={'file_extension': '.csv'}, order='timestamp DESC', page=1, page_size=20)
+
+    # Read the first kilobyte of a file stored without compression
+    turso.upload_file(file='data.json', codec='none')
+    json_file = turso.list_files(filters={'file_name': 'data', 'file_extension': '.json'})[0]
+    turso.read_range(json_file['id'], offset=0, length=1024)
+
+    # Many small files in a single round-trip
+    uploaded = turso.upload_many(files=['data_1.csv', 'data_2.csv', 'data_3.csv'])
+    turso.download_many(file_ids=[result['id'] for result in uploaded])
+
+    turso.drop_table('example_table')
+
+# Async example usage
+async def async_example_usage():
+    async with AsyncTursoFileManager(
+        url="your_turso_url",
+        auth_token="your_turso_auth_token",
+        concurrency=32
+        ) as async_turso:
+
+        reports = await async_turso.upload_many(files=[f'data_{index}.csv' for index in range(100)])
+        await async_turso.download_many(file_ids=range(1, len(reports) + 1), download_path='downloads')
 
-turso.upload_file(file='data.csv')
-turso.download_file(file_id=1)
-turso.drop_table('example_table')
+loop = asyncio.get_event_loop()
+loop.run_until_complete(async_example_usage())
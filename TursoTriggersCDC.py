@@ -1,7 +1,13 @@
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs
 import libsql_client
 import asyncio
-import re
+import time
+import decimal
+import datetime
+import functools
 
 """
 S3 to Turso Data Pipeline
@@ -14,13 +20,43 @@ Functions:
     - read_s3(aws_access_key_id:str, aws_secret_access_key:str) -> pd.DataFrame:
         Reads Parquet files from an S3 path into a Pandas DataFrame.
     
-    - obtain_schema(df:pd.DataFrame) -> str:
-        Generates the schema based on the DataFrame columns and their data types.
+    - sqlite_type(dtype, strict:bool) -> str:
+        Maps a pandas or Arrow data type to a SQLite column type.
 
-    - stage(url:str, auth_token:str, table:str, df:pd.DataFrame, schema:str):
-        Sets up the database environment by creating main and historic tables, along with triggers for CDC operations.
+    - obtain_schema(df:pd.DataFrame | pa.Schema, strict:bool) -> str:
+        Generates the schema based on the DataFrame columns (or Arrow schema fields) and their data types.
 
-    - example_usage(url, auth_token, table, df):
+    - stage(url:str, auth_token:str, table:str, df:pd.DataFrame, schema:str, explain:bool, strict:bool) -> list:
+        Sets up the database environment by creating main and historic tables, their indexes, along with triggers for CDC operations.
+
+    - explain_triggers(client, table:str) -> list:
+        Inspects the query plans of the trigger lookups and reports the statements that still scan a table.
+
+    - sqlite_value(value):
+        Converts a Python value libsql cannot bind (datetime, date, time, Decimal) to its TEXT representation.
+
+    - dataframe_to_params(df:pd.DataFrame) -> list:
+        Converts a DataFrame column-wise into typed parameter tuples, one per row, in the representation obtain_schema maps them to.
+
+    - insert_dataframe(client, table:str, df:pd.DataFrame, statements:list) -> int:
+        Inserts a DataFrame into the main table with parameterised inserts in a single batch, shared by load_dataframe and stream_s3.
+
+    - load_dataframe(url:str, auth_token:str, table:str, df:pd.DataFrame, chunk_size:int) -> dict:
+        Loads a DataFrame into the main table with parameterised inserts, batched in chunks inside transactions.
+
+    - as_of(url:str, auth_token:str, table:str, ts, chunk_size:int):
+        Streams the state of the main table at a past point in time from the historic table, in DataFrame chunks.
+
+    - changes_between(url:str, auth_token:str, table:str, t0, t1, chunk_size:int):
+        Streams the changes recorded in the historic table within a time range, in DataFrame chunks.
+
+    - stream_s3(url:str, auth_token:str, table:str, source:str, aws_access_key_id:str, aws_secret_access_key:str, batch_size:int, workers:int, queue_size:int) -> dict:
+        Streams Parquet files from S3 (or a local path) into the main table batch by batch, resuming from checkpoints.
+
+    - benchmark_validity(url:str, auth_token:str, table:str, history_sizes:tuple, writes:int) -> dict:
+        Measures the per-write cost of the CDC triggers as the history of an id grows.
+
+    - example_usage(url, auth_token, table):
         Demonstrates the usage of the setup by executing example SQL queries such as insert, update, and delete operations.
 
     - main(aws_access_key_id, aws_secret_access_key, url, auth_token):
@@ -42,29 +78,84 @@ def read_s3(aws_access_key_id:str, aws_secret_access_key:str) -> pd.DataFrame:
     
     return df
 
-def obtain_schema(df:pd.DataFrame) -> str:
-
-    # Define a function to clean up dtype strings
-    def clean_dtype(dtype_str):
-        return re.sub(r'\[\w+\]|\d+', '', dtype_str)
-
-    # Modify type_mapping to use cleaned up dtype strings
-    type_mapping = {
-        'int': 'INTEGER',
-        'float': 'REAL',
-        'object': 'TEXT',
-        'string' : 'TEXT',
-        'category': 'TEXT',
-        'datetime': 'TIMESTAMP'
-    }
-
-    # Convert Pandas dtypes to SQLite types
-    schema = ', '.join([f"{column} {type_mapping[clean_dtype(str(dtype))]}" for column, dtype in zip(df.columns, df.dtypes)])
+# Arrow types standing in for the values found in pandas object columns
+OBJECT_TYPES = {
+    'bytes': pa.binary(),
+    'integer': pa.int64(),
+    'floating': pa.float64(),
+    'boolean': pa.bool_(),
+    'datetime': pa.timestamp('us'),
+    'date': pa.date32(),
+    'time': pa.time64('us'),
+}
+
+# Python values libsql cannot bind, stored as TEXT
+TEXT_TYPES = (decimal.Decimal, datetime.date, datetime.time)
+
+
+def sqlite_type(dtype, strict:bool=False) -> str:
+
+    # Look through Arrow-backed pandas dtypes and dictionaries to the type of their values
+    if isinstance(dtype, pd.CategoricalDtype):
+        dtype = dtype.categories.dtype
+    if isinstance(dtype, pd.ArrowDtype):
+        dtype = dtype.pyarrow_dtype
+
+    if isinstance(dtype, pa.DataType):
+        if pa.types.is_dictionary(dtype):
+            dtype = dtype.value_type
+        if pa.types.is_boolean(dtype) or pa.types.is_integer(dtype):
+            sql_type = 'INTEGER'
+        elif pa.types.is_floating(dtype) or pa.types.is_duration(dtype):
+            sql_type = 'REAL'
+        elif pa.types.is_timestamp(dtype) or pa.types.is_date(dtype):
+            sql_type = 'TIMESTAMP'
+        elif pa.types.is_binary(dtype) or pa.types.is_large_binary(dtype) or pa.types.is_fixed_size_binary(dtype):
+            sql_type = 'BLOB'
+        elif pa.types.is_string(dtype) or pa.types.is_large_string(dtype) or pa.types.is_decimal(dtype) or pa.types.is_time(dtype):
+            sql_type = 'TEXT'
+        else:
+            sql_type = None
+    else:
+        if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+            sql_type = 'INTEGER'
+        elif pd.api.types.is_float_dtype(dtype) or pd.api.types.is_timedelta64_dtype(dtype):
+            sql_type = 'REAL'
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            sql_type = 'TIMESTAMP'
+        elif pd.api.types.is_string_dtype(dtype) or isinstance(dtype, pd.PeriodDtype):
+            sql_type = 'TEXT'
+        else:
+            sql_type = None
+
+    # STRICT tables only accept INTEGER, REAL, TEXT, BLOB and ANY
+    if strict:
+        return {'TIMESTAMP': 'TEXT', None: 'ANY'}.get(sql_type, sql_type)
+    return sql_type or 'BLOB'
+
+
+@functools.lru_cache(maxsize=None)
+def schema_from_fields(fields:tuple, strict:bool=False) -> str:
+    return ', '.join(f"{name} {sqlite_type(dtype, strict)}" for name, dtype in fields)
+
+
+def obtain_schema(df, strict:bool=False) -> str:
+
+    # Take the column types from a DataFrame or directly from an Arrow schema
+    if isinstance(df, pa.Schema):
+        fields = tuple((field.name, field.type) for field in df)
+    else:
+        # Object columns carry no type, so it is inferred from their first values
+        fields = tuple(
+            (column, OBJECT_TYPES.get(pd.api.types.infer_dtype(df[column].head(1000), skipna=True), dtype) if dtype == object else dtype)
+            for column, dtype in zip(df.columns, df.dtypes)
+        )
 
-    return schema
+    # Schemas are memoised per set of column names and types
+    return schema_from_fields(fields, strict)
 
 
-async def stage(url:str, auth_token:str, table:str, df:pd.DataFrame, schema:str):
+async def stage(url:str, auth_token:str, table:str, df:pd.DataFrame, schema:str, explain:bool=False, strict:bool=False) -> list:
     # Connect to the database using libsql_client asynchronously
     async with libsql_client.create_client(url=url, auth_token=auth_token) as client:
 
@@ -73,6 +164,10 @@ async def stage(url:str, auth_token:str, table:str, df:pd.DataFrame, schema:str)
         new_columns = f"(NEW.{', NEW.'.join(df.columns)}"
         old_columns = f"(OLD.{', OLD.'.join(df.columns)}"
         historic_table = f'{table}_HTB'
+
+        # STRICT tables reject values of the wrong type, and store timestamps as TEXT
+        table_options = 'STRICT' if strict else ''
+        timestamp_type = 'TEXT' if strict else 'TIMESTAMP'
         
         await client.batch(
             [
@@ -80,16 +175,16 @@ async def stage(url:str, auth_token:str, table:str, df:pd.DataFrame, schema:str)
         f"""
         CREATE TABLE IF NOT EXISTS {table}_TB (
             {schema}
-        )
+        ) {table_options}
         """,
         # Create historic table.
         f"""
         CREATE TABLE IF NOT EXISTS {historic_table} (
             {schema}
-            ,timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            ,timestamp {timestamp_type} DEFAULT CURRENT_TIMESTAMP
             ,operation TEXT DEFAULT 'insert'
             ,validity INT
-        )
+        ) {table_options}
         """,
         # Create trigger to check for uniqueness of ids.
         f"""
@@ -132,42 +227,388 @@ async def stage(url:str, auth_token:str, table:str, df:pd.DataFrame, schema:str)
             VALUES {old_columns}, CURRENT_TIMESTAMP, 'DELETE');
         END
         """,
-        # Create trigger to validate data after each operation (insert/update/delete)
+        # Index the ids of the main table, so updates and deletes by id do not scan it.
+        # Tables cannot get a primary key after creation, so a unique index is used instead.
+        f"""
+        CREATE UNIQUE INDEX IF NOT EXISTS {table}_TB_ID_IDX ON {table}_TB (id)
+        """,
+        # Index the history by id and time, for the uniqueness trigger and point-in-time reads.
         f"""
-        CREATE TRIGGER IF NOT EXISTS {table}_VALIDATE_TRIGGER AFTER INSERT ON {historic_table}
+        CREATE INDEX IF NOT EXISTS {table}_HTB_ID_TIMESTAMP_IDX ON {historic_table} (id, timestamp)
+        """,
+        # Index the history by time, for reading the changes within a time range.
+        f"""
+        CREATE INDEX IF NOT EXISTS {table}_HTB_TIMESTAMP_IDX ON {historic_table} (timestamp)
+        """,
+        # Index only the current rows of the history.
+        f"""
+        CREATE INDEX IF NOT EXISTS {table}_HTB_CURRENT_IDX ON {historic_table} (id) WHERE validity = 1
+        """,
+        # Keep only the latest valid row per id in existing history, so each id has one current row.
+        f"""
+        UPDATE {historic_table} SET validity = 0
+        WHERE validity = 1
+        AND rowid NOT IN (SELECT MAX(rowid) FROM {historic_table} WHERE validity = 1 GROUP BY id)
+        """,
+        # Replace the trigger that re-validated the whole history of an id on every change.
+        f"""
+        DROP TRIGGER IF EXISTS {table}_VALIDATE_TRIGGER
+        """,
+        # Drop the table of rowid pointers used by an earlier version of the trigger,
+        # as the rowids of the historic table are not stable across VACUUM.
+        f"""
+        DROP TABLE IF EXISTS {table}_CURRENT
+        """,
+        # Create trigger to validate data after each operation (insert/update/delete).
+        # Only the previously current row of the id is flipped, found through the partial index
+        # of current rows, so the cost of a write stays constant as history grows.
+        f"""
+        CREATE TRIGGER {table}_VALIDATE_TRIGGER AFTER INSERT ON {historic_table}
         FOR EACH ROW
         BEGIN
-            UPDATE {historic_table} 
-            SET validity = (CASE 
-                        WHEN timestamp = (SELECT MAX(timestamp) FROM {table}_HTB WHERE id = NEW.id group by id ) THEN 1 
-                        ELSE 0 
-                    END)
-        WHERE id = NEW.id;
+            UPDATE {historic_table} SET validity = 0
+            WHERE id = NEW.id AND validity = 1 AND rowid <> NEW.rowid;
+
+            UPDATE {historic_table} SET validity = 1
+            WHERE rowid = NEW.rowid;
         END
         """
             ]
         )
 
+        # Optionally report the trigger statements that would still scan a table.
+        if explain:
+            return await explain_triggers(client, table)
+        return []
+
+
+async def explain_triggers(client, table:str) -> list:
+    historic_table = f'{table}_HTB'
 
-async def example_usage(url, auth_token, table, df):
+    # Lookups run by the triggers on every write, with NEW values as parameters
+    lookups = {
+        f'{table}_ERRORS_TRIGGER': [
+            f"SELECT 1 FROM {historic_table} WHERE id = ?",
+        ],
+        f'{table}_VALIDATE_TRIGGER': [
+            f"UPDATE {historic_table} SET validity = 0 WHERE id = ? AND validity = 1 AND rowid <> ?",
+            f"UPDATE {historic_table} SET validity = 1 WHERE rowid = ?",
+        ],
+    }
+
+    scans = []
+    for trigger, statements in lookups.items():
+        for statement in statements:
+            result = await client.execute(f"EXPLAIN QUERY PLAN {statement}", (None,) * statement.count('?'))
+            # The last column of each plan row holds its description, e.g. 'SCAN <table>'
+            plan = [str(row[-1]) for row in result.rows]
+            if any(step.startswith('SCAN') for step in plan):
+                scans.append({'trigger': trigger, 'statement': statement, 'plan': plan})
+                print(f"{trigger} scans a table: {statement} -> {'; '.join(plan)}")
+
+    if not scans:
+        print(f"All trigger lookups of {table} use an index.")
+
+    return scans
+
+
+def sqlite_value(value):
+    # Format datetimes like CURRENT_TIMESTAMP, in UTC, and dates and times in ISO format
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(datetime.timezone.utc)
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    # Decimals are stored as TEXT to keep their exact value
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+def dataframe_to_params(df:pd.DataFrame) -> list:
+
+    # Convert each column at once to native Python values, with missing values as None
+    columns = []
+    for column in df.columns:
+        series = df[column]
+        arrow_type = series.dtype.pyarrow_dtype if isinstance(series.dtype, pd.ArrowDtype) else None
+        if pd.api.types.is_datetime64_any_dtype(series.dtype) and not (arrow_type and pa.types.is_date(arrow_type)):
+            # Store timestamps in UTC, as CURRENT_TIMESTAMP does
+            if getattr(series.dt, 'tz', None) is not None:
+                series = series.dt.tz_convert('UTC')
+            # Arrow formats %S with fractional seconds, so Arrow timestamps are formatted by numpy
+            if arrow_type:
+                series = series.dt.tz_localize(None).astype('datetime64[us]')
+            values = series.dt.strftime('%Y-%m-%d %H:%M:%S')
+        elif pd.api.types.is_timedelta64_dtype(series.dtype) or (arrow_type and pa.types.is_duration(arrow_type)):
+            values = series.dt.total_seconds()
+        else:
+            values = series.astype(object)
+            # Decimals, dates and times (e.g. Arrow date32 and time64 columns) are converted to TEXT
+            first = series.first_valid_index()
+            if first is not None and isinstance(values.loc[first], TEXT_TYPES):
+                values = values.map(sqlite_value, na_action='ignore')
+        columns.append(values.astype(object).where(series.notna(), None).tolist())
+
+    # Transpose the columns into one parameter tuple per row
+    return list(zip(*columns))
+
+
+async def insert_dataframe(client, table:str, df:pd.DataFrame, statements:list=()) -> int:
+    # Send the parameterised inserts of the rows as one batch, which runs in a single transaction,
+    # followed by any further statements of the same transaction, e.g. a checkpoint
+    columns = ', '.join(df.columns)
+    placeholders = ', '.join('?' for _ in df.columns)
+    insert_query = f"INSERT INTO {table}_TB ({columns}) VALUES ({placeholders})"
+
+    params = dataframe_to_params(df)
+    await client.batch([(insert_query, row) for row in params] + list(statements))
+    return len(params)
+
+
+async def load_dataframe(url:str, auth_token:str, table:str, df:pd.DataFrame, chunk_size:int=1000) -> dict:
     # Connect to the database using libsql_client asynchronously
     async with libsql_client.create_client(url=url, auth_token=auth_token) as client:
 
-        # Convert DataFrame values to a bytes-like object
-        values = df.to_records(index=False)
-        values = ', '.join(str(x) for x in values)
-        values = values.replace('None', "Null")
-        values = values.replace("'NaT'", "Null")
-        
-        columns =  ', '.join(df.columns)
+        start = time.perf_counter()
+        rows = 0
+
+        # Send each chunk as one batch
+        for offset in range(0, len(df), chunk_size):
+            rows += await insert_dataframe(client, table, df.iloc[offset:offset + chunk_size])
+
+        seconds = time.perf_counter() - start
+        stats = {
+            'rows': rows,
+            'seconds': seconds,
+            'rows_per_s': rows / seconds if seconds else 0.0
+        }
+        print(f"Loaded {rows} rows into {table}_TB at {stats['rows_per_s']:.0f} rows/s.")
+
+        return stats
+
+
+def to_timestamp(ts) -> str:
+    # Format a point in time the way CURRENT_TIMESTAMP stores it in the historic table, in UTC
+    ts = pd.Timestamp(ts)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert('UTC')
+    return ts.strftime('%Y-%m-%d %H:%M:%S')
+
+
+async def as_of(url:str, auth_token:str, table:str, ts, chunk_size:int=10000):
+    historic_table = f'{table}_HTB'
+
+    # Page through the ids in order, and for each id pick its latest row at the given time
+    # through the (id, timestamp) index, so that no page reads more than its own history.
+    query = f"""
+        SELECT ids.id AS page_id, h.*
+        FROM (SELECT DISTINCT id FROM {historic_table} {{after}} ORDER BY id LIMIT ?) AS ids
+        LEFT JOIN {historic_table} AS h ON h.rowid = (
+            SELECT rowid FROM {historic_table}
+            WHERE id = ids.id AND timestamp <= ?
+            ORDER BY timestamp DESC, rowid DESC
+            LIMIT 1
+        )
+        ORDER BY ids.id
+    """
+
+    async with libsql_client.create_client(url=url, auth_token=auth_token) as client:
+        # The first page starts from the lowest id, whatever its type
+        result = await client.execute(query.format(after=''), (chunk_size, to_timestamp(ts)))
+        while result.rows:
+            last_id = result.rows[-1][0]
+
+            # Skip ids that did not exist yet or had been deleted at that time
+            operation = result.columns.index('operation')
+            rows = [tuple(row) for row in result.rows if row[operation] not in (None, 'DELETE')]
+            if rows:
+                chunk = pd.DataFrame(rows, columns=result.columns)
+                yield chunk.drop(columns=['page_id', 'operation', 'validity'])
+
+            result = await client.execute(query.format(after='WHERE id > ?'), (last_id, chunk_size, to_timestamp(ts)))
+
+
+async def changes_between(url:str, auth_token:str, table:str, t0, t1, chunk_size:int=10000):
+    historic_table = f'{table}_HTB'
+
+    # Page through the changes in time order, continuing after the last row of the previous page
+    query = f"""
+        SELECT rowid AS change_id, * FROM {historic_table}
+        WHERE timestamp > ? AND timestamp <= ? AND (timestamp, rowid) > (?, ?)
+        ORDER BY timestamp, rowid
+        LIMIT ?
+    """
+
+    async with libsql_client.create_client(url=url, auth_token=auth_token) as client:
+        last = ('', 0)
+        while True:
+            result = await client.execute(query, (to_timestamp(t0), to_timestamp(t1), *last, chunk_size))
+            if not result.rows:
+                return
+            chunk = pd.DataFrame([tuple(row) for row in result.rows], columns=result.columns)
+            last = (result.rows[-1][result.columns.index('timestamp')], result.rows[-1][0])
+
+            yield chunk.drop(columns=['change_id', 'validity'])
+            if len(chunk) < chunk_size:
+                return
+
+
+async def stream_s3(url:str, auth_token:str, table:str, source:str, aws_access_key_id:str=None, aws_secret_access_key:str=None, batch_size:int=10000, workers:int=4, queue_size:int=8) -> dict:
+    # Open the Parquet files lazily, either from S3 or from a local path
+    if source.startswith('s3://'):
+        filesystem = pyarrow.fs.S3FileSystem(access_key=aws_access_key_id, secret_key=aws_secret_access_key)
+        dataset = ds.dataset(source[len('s3://'):], format='parquet', filesystem=filesystem)
+    else:
+        dataset = ds.dataset(source, format='parquet')
+
+    checkpoint_table = f'{table}_CHECKPOINTS'
+    checkpoint_query = f"INSERT INTO {checkpoint_table} (file_key, row_offset, num_rows) VALUES (?, ?, ?)"
+
+    async with libsql_client.create_client(url=url, auth_token=auth_token) as client:
+
+        # Load the checkpoints of previous runs, a row_offset of -1 marks a completed file.
+        # Checkpoints record the rows they loaded, so a run may resume with another batch_size.
+        await client.execute(f"""
+            CREATE TABLE IF NOT EXISTS {checkpoint_table} (
+                file_key TEXT
+                ,row_offset INTEGER
+                ,num_rows INTEGER
+                ,PRIMARY KEY (file_key, row_offset)
+            )
+        """)
+        result = await client.execute(f"SELECT file_key, row_offset, num_rows FROM {checkpoint_table} ORDER BY file_key, row_offset")
+        completed_files = set()
+        loaded = {}
+        for file_key, row_offset, num_rows in result.rows:
+            if row_offset == -1:
+                completed_files.add(file_key)
+            else:
+                loaded.setdefault(file_key, []).append((row_offset, row_offset + num_rows))
+
+        def unloaded(file_key, start, end):
+            # Split the rows [start, end) of a file around the ranges loaded by previous runs
+            for loaded_start, loaded_end in loaded.get(file_key, ()):
+                if loaded_end <= start or loaded_start >= end:
+                    continue
+                if loaded_start > start:
+                    yield start, loaded_start
+                start = max(start, loaded_end)
+            if start < end:
+                yield start, end
+
+        # Bounded queue, so reading pauses while the workers are behind
+        queue = asyncio.Queue(maxsize=queue_size)
+        pending = {}
+        read_files = set()
+        errors = []
+        stats = {'files': 0, 'batches': 0, 'skipped_rows': 0, 'rows': 0}
+
+        async def complete_file(file_key):
+            await client.execute(checkpoint_query, (file_key, -1, 0))
+            stats['files'] += 1
+
+        async def worker():
+            while (item := await queue.get()) is not None:
+                file_key, row_offset, df = item
+                try:
+                    # Once a worker fails, drain the queue so that reading does not block
+                    if errors:
+                        continue
+                    # Insert the rows and their checkpoint in one transaction, as load_dataframe does
+                    rows = await insert_dataframe(client, table, df, [(checkpoint_query, (file_key, row_offset, len(df)))])
+                    stats['batches'] += 1
+                    stats['rows'] += rows
+
+                    pending[file_key] -= 1
+                    if not pending[file_key] and file_key in read_files:
+                        await complete_file(file_key)
+                except Exception as e:
+                    errors.append(e)
+
+        start = time.perf_counter()
+        tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+        staged = False
+        try:
+            for fragment in dataset.get_fragments():
+                file_key = fragment.path
+                if file_key in completed_files or errors:
+                    continue
+                pending[file_key] = 0
+
+                # Read one record batch at a time off the event loop
+                batches = fragment.to_batches(batch_size=batch_size)
+                row_offset = 0
+                while not errors and (batch := await asyncio.to_thread(next, batches, None)) is not None:
+                    stats['skipped_rows'] += batch.num_rows
+                    # Only the rows of the batch that no previous run loaded are queued
+                    for range_start, range_end in unloaded(file_key, row_offset, row_offset + batch.num_rows):
+                        df = batch.slice(range_start - row_offset, range_end - range_start).to_pandas()
+                        # Create the tables and triggers from the schema of the first batch
+                        if not staged:
+                            await stage(url, auth_token, table, df, obtain_schema(batch.schema))
+                            staged = True
+                        stats['skipped_rows'] -= range_end - range_start
+                        pending[file_key] += 1
+                        await queue.put((file_key, range_start, df))
+                    row_offset += batch.num_rows
+
+                read_files.add(file_key)
+                if not pending[file_key] and not errors:
+                    await complete_file(file_key)
+        finally:
+            for _ in tasks:
+                await queue.put(None)
+            await asyncio.gather(*tasks)
+
+        if errors:
+            raise errors[0]
+
+        stats['seconds'] = time.perf_counter() - start
+        stats['rows_per_s'] = stats['rows'] / stats['seconds'] if stats['seconds'] else 0.0
+        print(f"Streamed {stats['rows']} rows from {stats['files']} files into {table}_TB at {stats['rows_per_s']:.0f} rows/s.")
+
+        return stats
+
+
+async def benchmark_validity(url:str, auth_token:str, table:str='BENCHMARK', history_sizes:tuple=(100, 1000, 10000), writes:int=100) -> dict:
+    # Stage a minimal table, e.g. on a local 'file:' database
+    df = pd.DataFrame({'id': ['id1'], 'numeric_col': [0]})
+    await stage(url, auth_token, table, df, obtain_schema(df))
+
+    async with libsql_client.create_client(url=url, auth_token=auth_token) as client:
+        await client.execute(f"INSERT INTO {table}_TB (id, numeric_col) VALUES ('id1', 0)")
+        update_query = f"UPDATE {table}_TB SET numeric_col = ? WHERE id = 'id1'"
+
+        history = 1
+        results = {}
+        for history_size in history_sizes:
+            # Grow the history of the id up to the target size
+            growth = history_size - writes - history
+            for offset in range(0, max(growth, 0), 1000):
+                await client.batch([(update_query, (history + i,)) for i in range(offset, min(offset + 1000, growth))])
+            history += max(growth, 0)
+
+            # Time the writes at this history size, one transaction each
+            start = time.perf_counter()
+            for i in range(writes):
+                await client.execute(update_query, (history + i,))
+            history += writes
+
+            results[history_size] = (time.perf_counter() - start) / writes * 1000
+            print(f"History of {history_size} rows: {results[history_size]:.3f} ms per write.")
+
+    return results
+
+
+async def example_usage(url, auth_token, table):
+    # Connect to the database using libsql_client asynchronously
+    async with libsql_client.create_client(url=url, auth_token=auth_token) as client:
         
         # Define the batch queries with added delay between each query
         batch_queries = [
             f"""
-            INSERT INTO {table}_TB ({columns})
-            VALUES {values}
-            """
-            ,f"""
             INSERT INTO {table}_TB (id, numeric_col) values ('id4', 10)
             """
             ,f"""
@@ -179,26 +620,35 @@ async def example_usage(url, auth_token, table, df):
         ]
         
         # Iterate through the batch queries and add a delay between each query
+        # CURRENT_TIMESTAMP is recorded in UTC with a resolution of seconds
+        start = pd.Timestamp.now(tz='UTC')
+        await asyncio.sleep(1)
         for query in batch_queries:
             await client.execute(query)
             await asyncio.sleep(1)  # Add 1 second delay between each query
 
+    # Read back the table as it was before the queries, and the changes they made
+    async for chunk in as_of(url, auth_token, table, start):
+        print(chunk)
 
+    async for chunk in changes_between(url, auth_token, table, start, pd.Timestamp.now(tz='UTC')):
+        print(chunk)
 
 
-async def main(aws_access_key_id, aws_secret_access_key, url, auth_token):
 
-    # Get dataframe data.
-    df = read_s3(aws_access_key_id, aws_secret_access_key)
-    
-    #  To create the table structure, obtain the schema from the df.
-    schema = obtain_schema(df)
 
-    # Create triggers for tracking cdc oeprations.
-    await stage(url, auth_token, 'TABLE_NAME', df, schema)
+async def main(aws_access_key_id, aws_secret_access_key, url, auth_token):
+
+    # Stream the Parquet files into the table, creating the table structure and the triggers
+    # for tracking cdc operations from the schema of the first batch.
+    await stream_s3(
+        url, auth_token, 'TABLE_NAME', "s3://AWS_S3_BUCKET/FOLDER/",
+        aws_access_key_id=aws_access_key_id,
+        aws_secret_access_key=aws_secret_access_key
+    )
 
     # Execute insert, update, delete to showcase usage.
-    await example_usage(url, auth_token, 'TABLE_NAME', df)
+    await example_usage(url, auth_token, 'TABLE_NAME')
 
 loop = asyncio.get_event_loop()
 loop.run_until_complete(